@@ -0,0 +1,123 @@
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from django.db import connections
+
+
+PAGE_SIZE = 6
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Сколько запросов и миллисекунд SQL может потратить маршрут."""
+
+    queries: int
+    sql_ms: float
+
+
+# Бюджеты маршрутов api/urls.py по (имя маршрута, метод).
+# Списки меряются на странице из PAGE_SIZE элементов, запросы
+# с авторизацией включают проверку токена.
+BUDGETS = {
+    ('api-root', 'GET'): Budget(queries=0, sql_ms=0),
+    ('ingredients-list', 'GET'): Budget(queries=1, sql_ms=20),
+    ('ingredients-detail', 'GET'): Budget(queries=1, sql_ms=10),
+    ('tags-list', 'GET'): Budget(queries=1, sql_ms=10),
+    ('tags-detail', 'GET'): Budget(queries=1, sql_ms=10),
+    ('recipies-list', 'GET'): Budget(queries=8, sql_ms=50),
+    ('recipies-list', 'POST'): Budget(queries=16, sql_ms=100),
+    ('recipies-detail', 'GET'): Budget(queries=7, sql_ms=30),
+    ('recipies-detail', 'PATCH'): Budget(queries=24, sql_ms=150),
+    ('recipies-detail', 'DELETE'): Budget(queries=9, sql_ms=100),
+    ('recipies-favorite', 'POST'): Budget(queries=5, sql_ms=30),
+    ('recipies-favorite', 'DELETE'): Budget(queries=4, sql_ms=30),
+    ('recipies-shopping-cart', 'POST'): Budget(queries=10, sql_ms=50),
+    ('recipies-shopping-cart', 'DELETE'): Budget(queries=9, sql_ms=50),
+    ('recipies-download-shopping-cart', 'GET'): Budget(
+        queries=2, sql_ms=50
+    ),
+    ('recipies-download-shopping-cart', 'POST'): Budget(
+        queries=2, sql_ms=20
+    ),
+    ('users-list', 'GET'): Budget(queries=3, sql_ms=30),
+    ('users-list', 'POST'): Budget(queries=4, sql_ms=30),
+    ('users-detail', 'GET'): Budget(queries=2, sql_ms=20),
+    ('users-me', 'GET'): Budget(queries=2, sql_ms=20),
+    ('users-set-password', 'POST'): Budget(queries=2, sql_ms=20),
+    ('subscriptions', 'GET'): Budget(queries=4, sql_ms=50),
+    ('subscribe', 'POST'): Budget(queries=11, sql_ms=30),
+    ('subscribe', 'DELETE'): Budget(queries=5, sql_ms=30),
+    ('jobs-list', 'GET'): Budget(queries=3, sql_ms=20),
+    ('jobs-detail', 'GET'): Budget(queries=2, sql_ms=10),
+    ('jobs-download', 'GET'): Budget(queries=2, sql_ms=10),
+    ('login', 'POST'): Budget(queries=5, sql_ms=20),
+    ('logout', 'POST'): Budget(queries=3, sql_ms=20),
+}
+
+# Маршруты djoser для подтверждений по почте, проект их не использует.
+EXEMPT_ROUTES = {
+    'users-activation',
+    'users-resend-activation',
+    'users-reset-password',
+    'users-reset-password-confirm',
+    'users-reset-username',
+    'users-reset-username-confirm',
+    'users-set-username',
+}
+
+
+def get_budget(url_name, method):
+    return BUDGETS.get((url_name, method))
+
+
+class QueryRecorder:
+    """Записывает SQL и время его выполнения на всех соединениях."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, (time.perf_counter() - started) * 1000)
+            )
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    @property
+    def sql_ms(self):
+        return sum(duration for _, duration in self.queries)
+
+    def exceeded(self, budget, timing=True):
+        """Описания превышений бюджета, пустой список если уложились.
+
+        timing=False проверяет только число запросов.
+        """
+        problems = []
+        if len(self.queries) > budget.queries:
+            problems.append(
+                f'{len(self.queries)} запросов при бюджете {budget.queries}'
+            )
+        if timing and self.sql_ms > budget.sql_ms:
+            problems.append(
+                f'{self.sql_ms:.1f} мс SQL при бюджете {budget.sql_ms} мс'
+            )
+        return problems
+
+    def report(self, slowest=None):
+        """Запросы в порядке выполнения или slowest самых долгих."""
+        queries = self.queries
+        if slowest is not None:
+            queries = sorted(queries, key=lambda query: -query[1])[:slowest]
+        return '\n'.join(
+            f'  {duration:8.2f} мс  {sql}' for sql, duration in queries
+        )
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+
+def check_size(size):
+    if size > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise serializers.ValidationError(
+            'Размер изображения не должен превышать '
+            f'{settings.RECIPE_IMAGE_MAX_BYTES} байт.'
+        )
+
+
+def decode_base64(data):
+    """Декодирует картинку из base64, проверив размер до декодирования."""
+    if ';base64,' in data:
+        data = data.split(';base64,', 1)[1]
+    check_size(len(data) * 3 // 4)
+    try:
+        content = base64.b64decode(data)
+    except (TypeError, binascii.Error, ValueError):
+        raise serializers.ValidationError('Загрузите корректное изображение.')
+    return SimpleUploadedFile(name='image', content=content)
+
+
+def inspect_image(file, allowed_formats):
+    """Проверяет картинку по заголовку, не декодируя пиксели.
+
+    Возвращает формат картинки. Размеры в пикселях проверяются
+    до verify(), поэтому огромные картинки отбрасываются сразу.
+    """
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            image_format = (image.format or '').lower()
+            if image_format not in allowed_formats:
+                raise serializers.ValidationError(
+                    'Неподдерживаемый формат изображения.'
+                )
+            width, height = image.size
+            if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+                raise serializers.ValidationError(
+                    'Изображение не должно содержать больше '
+                    f'{settings.RECIPE_IMAGE_MAX_PIXELS} пикселей.'
+                )
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Загрузите корректное изображение.')
+    finally:
+        file.seek(0)
+    return image_format
+
+
+class LimitedImageField(Base64ImageField):
+    """Картинка в base64 или файлом из multipart с лимитами размера."""
+
+    def load(self, data):
+        if isinstance(data, str):
+            data = decode_base64(data)
+        elif isinstance(data, UploadedFile):
+            check_size(data.size)
+        else:
+            raise serializers.ValidationError(
+                'Ожидается изображение в base64 или файл.'
+            )
+        extension = inspect_image(data, self.ALLOWED_TYPES)
+        data.name = f'{uuid.uuid4()}.{extension}'
+        return data
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        return self.load(data)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, который проверяется одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pks = []
+        for pk in data:
+            try:
+                pks.append(queryset.model._meta.pk.to_python(pk))
+            except (TypeError, ValueError, DjangoValidationError):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+        objects = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in pks]
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from pathlib import Path
+
+
+class FileLRUCache:
+    """Ограниченный по размеру LRU-кеш файлов на локальном диске.
+
+    Время последнего обращения хранится в mtime файла, поэтому кеш
+    общий для всех воркеров. При превышении max_size удаляются
+    давно не запрашивавшиеся файлы. Каталог можно передать функцией,
+    тогда он берётся при каждом обращении, например из настроек,
+    переопределённых в тестах.
+    """
+
+    def __init__(self, directory, max_size, suffix=''):
+        self._directory = directory
+        self.max_size = max_size
+        self.suffix = suffix
+
+    @property
+    def directory(self):
+        if callable(self._directory):
+            return Path(self._directory())
+        return Path(self._directory)
+
+    def path(self, key):
+        return self.directory / f'{key}{self.suffix}'
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            content = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return content
+
+    def set(self, key, content):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=self.directory, prefix='.'
+        )
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.replace(temp_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
@@ -22,6 +22,7 @@ class RecipeFilter(filters.FilterSet):
         to_field_name='slug',
         queryset=Tag.objects.all(),
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -30,6 +31,7 @@ class RecipeFilter(filters.FilterSet):
             'is_in_shopping_cart',
             'author',
             'tags',
+            'search',
         )
 
     def filter_is_favorited(self, queryset, name, value):
@@ -44,11 +46,14 @@ class RecipeFilter(filters.FilterSet):
             return queryset.filter(recipe_cart__user=user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return queryset.search(query=value)
+
 
 class IngredientFilter(filters.FilterSet):
     """Фильтр для ингредиентов."""
 
-    name = filters.CharFilter(field_name='name', lookup_expr='startswith')
+    name = filters.CharFilter(field_name='name', lookup_expr='istartswith')
 
     class Meta:
         model = Ingredient
@@ -0,0 +1,117 @@
+from django.core.cache import caches
+from django.db import transaction
+
+from api.metrics import count_cache
+from recipe.models import ReciepeShopList, RecipeFavourite
+from recipe.versions import ingredients_version, tags_version
+from user.models import UserFollowing
+
+
+FRAGMENT_LAYOUT_VERSION = '1'
+
+
+class RecipeFragmentCache:
+    """Кеш независимой от зрителя части сериализованного рецепта.
+
+    Значение хранится вместе с версией: временем изменения рецепта
+    и версиями тегов и ингредиентов. Поэтому даже локальный для
+    процесса кеш не отдаёт устаревшие данные после изменений в
+    другом воркере, а удаление по ключу лишь освобождает место.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, recipe_id):
+        return f'recipe_fragment:{recipe_id}'
+
+    def catalog_version(self):
+        return ':'.join(
+            (
+                FRAGMENT_LAYOUT_VERSION,
+                tags_version.get(),
+                ingredients_version.get(),
+            )
+        )
+
+    def version(self, recipe, catalog_version):
+        return f'{recipe.updated.timestamp()}:{catalog_version}'
+
+    def get_many(self, recipes):
+        catalog_version = self.catalog_version()
+        versions = {
+            recipe.pk: self.version(recipe, catalog_version)
+            for recipe in recipes
+        }
+        cached = self.cache.get_many(
+            [self.key(recipe_id) for recipe_id in versions]
+        )
+        bodies = {}
+        for recipe_id, version in versions.items():
+            entry = cached.get(self.key(recipe_id))
+            if entry is not None and entry[0] == version:
+                bodies[recipe_id] = entry[1]
+        count_cache(self.alias, len(bodies), len(versions) - len(bodies))
+        return bodies, versions
+
+    def set_many(self, bodies, versions):
+        self.cache.set_many(
+            {
+                self.key(recipe_id): (versions[recipe_id], body)
+                for recipe_id, body in bodies.items()
+            }
+        )
+
+    def invalidate(self, recipe_id):
+        transaction.on_commit(
+            lambda: self.cache.delete(self.key(recipe_id))
+        )
+
+
+fragment_cache = RecipeFragmentCache('recipe_fragments')
+
+
+class ViewerState:
+    """Избранное, корзина и подписки зрителя для набора рецептов.
+
+    Множества id загружаются одним запросом на каждое. Рецепты,
+    у которых уже есть аннотации is_favorited и is_in_shopping_cart,
+    в запросы не попадают.
+    """
+
+    def __init__(self, user, recipes):
+        self.favorites = self.cart = self.follows = frozenset()
+        pending = [
+            recipe for recipe in recipes
+            if not hasattr(recipe, 'is_favorited')
+        ]
+        if not pending or not user.is_authenticated:
+            return
+        recipe_ids = [recipe.pk for recipe in pending]
+        self.favorites = set(
+            RecipeFavourite.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True)
+        )
+        self.cart = set(
+            ReciepeShopList.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True)
+        )
+        self.follows = set(
+            UserFollowing.objects.filter(
+                following_user=user,
+                user_id__in={recipe.author_id for recipe in pending},
+            ).values_list('user_id', flat=True)
+        )
+
+    def apply(self, recipe):
+        if not hasattr(recipe, 'is_favorited'):
+            recipe.is_favorited = recipe.pk in self.favorites
+            recipe.is_in_shopping_cart = recipe.pk in self.cart
+        if not hasattr(recipe.author, 'is_subscribed'):
+            recipe.author.is_subscribed = recipe.author_id in self.follows
@@ -0,0 +1,13 @@
+from api.utils import pdf_cache, render_pdf, shopping_cart_key
+from recipe.models import ShopListIngredient
+
+
+def render_shopping_list_pdf(job):
+    """Фоновая задача: pdf со списком покупок пользователя."""
+    items = sorted(ShopListIngredient.objects.all_ingredients(user=job.user))
+    key = shopping_cart_key(items)
+    content = pdf_cache.get(key)
+    if content is None:
+        content = render_pdf(items)
+        pdf_cache.set(key, content)
+    return 'pdf', content
@@ -0,0 +1,76 @@
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+# Если задан PROMETHEUS_MULTIPROC_DIR, значения пишутся в файлы
+# в этом каталоге и /metrics собирает их со всех воркеров gunicorn.
+# Метрики фоновых задач, например PDF_RENDER_DURATION, отдаёт
+# run_jobs на порту JOBS_METRICS_PORT.
+
+REQUESTS = Counter(
+    'foodgram_http_requests',
+    'Запросы по вью, методу и коду ответа.',
+    ('view', 'method', 'status'),
+)
+
+REQUEST_DURATION = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки запроса.',
+    ('view', 'method'),
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+)
+
+DB_QUERIES = Counter(
+    'foodgram_db_queries',
+    'SQL-запросы, выполненные при обработке запросов.',
+    ('view',),
+)
+
+DB_DURATION = Counter(
+    'foodgram_db_duration_seconds',
+    'Время выполнения SQL-запросов.',
+    ('view',),
+)
+
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кешам с результатом hit или miss.',
+    ('cache', 'result'),
+)
+
+PDF_RENDER_DURATION = Histogram(
+    'foodgram_pdf_render_duration_seconds',
+    'Время генерации pdf списка покупок.',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+def count_cache(cache, hits, misses=0):
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
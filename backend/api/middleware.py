@@ -0,0 +1,224 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from api.budgets import QueryRecorder, get_budget
+from api.metrics import DB_DURATION, DB_QUERIES, REQUEST_DURATION, REQUESTS
+from api.slow_queries import slow_query_log
+
+
+logger = logging.getLogger(__name__)
+
+timing_logger = logging.getLogger('api.timing')
+
+
+class QueryBudgetMiddleware:
+    """Предупреждает в лог, когда запрос выходит за бюджет из api.budgets.
+
+    Включается QUERY_BUDGET_WARNINGS, например на стейджинге.
+    Запросы, выполненные при отдаче потокового ответа, не учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_WARNINGS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        match = request.resolver_match
+        budget = match and get_budget(match.url_name, request.method)
+        if budget:
+            problems = recorder.exceeded(budget)
+            if problems:
+                logger.warning(
+                    '%s %s (%s): %s\n%s',
+                    request.method,
+                    request.path,
+                    match.url_name,
+                    ', '.join(problems),
+                    recorder.report(
+                        slowest=settings.QUERY_BUDGET_REPORTED_QUERIES
+                    ),
+                )
+        return response
+
+
+def view_name(request):
+    """Имя вью вида RecipeViewSet.list, SubscribeView или модуль.функция."""
+    match = request.resolver_match
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match._func_path
+    action = (getattr(match.func, 'actions', None) or {}).get(
+        request.method.lower()
+    )
+    if action:
+        return f'{view_class.__name__}.{action}'
+    return view_class.__name__
+
+
+class RequestTiming:
+    """Замеры одного запроса в миллисекундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.recorder = QueryRecorder()
+        self.view_started = None
+        self.view_finished = None
+        self.sql_ms_before_view = 0
+        self.view_sql_ms = 0
+
+    def since(self, moment):
+        return (time.perf_counter() - moment) * 1000
+
+    def metrics(self):
+        metrics = {
+            'queries': len(self.recorder.queries),
+            'db_ms': self.recorder.sql_ms,
+            'serialize_ms': 0,
+            'render_ms': 0,
+            'total_ms': self.since(self.started),
+        }
+        if self.view_finished is not None:
+            metrics['serialize_ms'] = max(
+                0,
+                (self.view_finished - self.view_started) * 1000
+                - (self.view_sql_ms - self.sql_ms_before_view),
+            )
+            metrics['render_ms'] = self.since(self.view_finished)
+        elif self.view_started is not None:
+            metrics['serialize_ms'] = max(
+                0,
+                self.since(self.view_started)
+                - (metrics['db_ms'] - self.sql_ms_before_view),
+            )
+        return metrics
+
+
+class RequestTimingMiddleware:
+    """Замеряет SQL, сериализацию, рендер и общее время запроса.
+
+    Замер включается для доли запросов REQUEST_TIMING_SAMPLE_RATE,
+    результат уходит в заголовок Server-Timing и строкой JSON в лог
+    api.timing. Сериализация считается как время обработчика вью без
+    SQL: у вьюсетов DRF это в основном работа сериализаторов.
+    Запросы и рендер при отдаче потокового ответа не учитываются.
+    Middleware стоит сразу после MetricsMiddleware, чтобы total
+    включал остальные middleware, а его process_template_response
+    вызывался последним, прямо перед рендером ответа.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        timing = request.timing = RequestTiming()
+        with timing.recorder.record():
+            response = self.get_response(request)
+        metrics = timing.metrics()
+        if settings.REQUEST_TIMING_HEADER:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={metrics["db_ms"]:.1f};'
+                f'desc="{metrics["queries"]} queries"',
+                f'serialize;dur={metrics["serialize_ms"]:.1f}',
+                f'render;dur={metrics["render_ms"]:.1f}',
+                f'total;dur={metrics["total_ms"]:.1f}',
+            ))
+        timing_logger.info(json.dumps({
+            'view': view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **{
+                name: round(value, 2) if isinstance(value, float) else value
+                for name, value in metrics.items()
+            },
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+            timing.sql_ms_before_view = timing.recorder.sql_ms
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, 'timing', None)
+        if timing is not None and timing.view_started is not None:
+            timing.view_finished = time.perf_counter()
+            timing.view_sql_ms = timing.recorder.sql_ms
+        return response
+
+
+class MetricsMiddleware:
+    """Собирает метрики запросов для /metrics.
+
+    Стоит первым, чтобы время запроса включало остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        view = view_name(request) or 'unresolved'
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        REQUEST_DURATION.labels(view, request.method).observe(
+            time.perf_counter() - started
+        )
+        if recorder.queries:
+            DB_QUERIES.labels(view).inc(len(recorder.queries))
+            DB_DURATION.labels(view).inc(recorder.sql_ms / 1000)
+        return response
+
+
+class SlowQueryMiddleware:
+    """Записывает запросы дольше SLOW_QUERY_THRESHOLD_MS в slow_query_log.
+
+    Отчёт печатает команда slow_query_report.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def capture(execute, sql, params, many, context):
+            started = time.perf_counter()
+            result = execute(sql, params, many, context)
+            duration_ms = (time.perf_counter() - started) * 1000
+            if not many and duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                slow_query_log.record(
+                    context['connection'],
+                    sql,
+                    params,
+                    duration_ms,
+                    view_name(request) or 'unresolved',
+                )
+            return result
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(capture))
+            return self.get_response(request)
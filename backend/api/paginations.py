@@ -1,5 +1,90 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CountStrategyPaginator(Paginator):
+    """Пагинатор с настраиваемым подсчётом количества объектов.
+
+    Для запросов без фильтров вместо точного COUNT(*) может
+    использовать оценку планировщика Postgres (estimate) или
+    закешированное значение (cached).
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        strategy = settings.PAGINATION_COUNT_STRATEGY
+        if query is None or query.where or strategy == 'exact':
+            return super().count
+        if strategy == 'estimate':
+            estimate = self.estimated_count()
+            if estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+                return estimate
+            return super().count
+        if strategy == 'cached':
+            return cache.get_or_set(
+                f'pagination_count:{query.model._meta.db_table}',
+                lambda: super(CountStrategyPaginator, self).count,
+                settings.PAGINATION_COUNT_CACHE_TIMEOUT,
+            )
+        return super().count
+
+    def estimated_count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                (self.object_list.model._meta.db_table,),
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] > 0 else 0
 
 
 class PageNumberPagination(PageNumberPagination):
+    django_paginator_class = CountStrategyPaginator
     page_size_query_param = 'limit'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Пагинация рецептов по ключу (pub_date, id) без COUNT и OFFSET."""
+
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+
+
+class RecipePagination(PageNumberPagination):
+    """Пагинация рецептов.
+
+    По умолчанию постраничная, при наличии параметра cursor
+    (в том числе пустого) переключается на пагинацию по курсору.
+    Поиск всегда постраничный: курсор упорядочивает по (pub_date, id)
+    и потерял бы сортировку по релевантности, поэтому при непустом
+    search параметр cursor игнорируется.
+    """
+
+    cursor_query_param = RecipeCursorPagination.cursor_query_param
+    search_query_param = 'search'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params and not (
+            request.query_params.get(self.search_query_param, '').split()
+        ):
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view=view
+            )
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,29 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """Multipart-парсер, который декодирует JSON во вложенных полях.
+
+    Файлы остаются на диске или в памяти по правилам загрузки Django
+    и попадают в data вместе с остальными полями, а поля из
+    multipart_json_fields вьюхи разбираются как JSON.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        json_fields = getattr(
+            (parser_context or {}).get('view'), 'multipart_json_fields', ()
+        )
+        data = {}
+        for key, value in result.data.items():
+            if key in json_fields:
+                try:
+                    value = json.loads(value)
+                except ValueError as error:
+                    raise ParseError(f'Поле {key}: неверный JSON - {error}')
+            data[key] = value
+        data.update(result.files.items())
+        return DataAndFiles(data, {})
@@ -0,0 +1,42 @@
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.renderers import JSONRenderer
+
+from api.metrics import count_cache
+
+
+class PrecomputedJSON:
+    """JSON ответ, отрендеренный один раз на процесс и версию данных."""
+
+    def __init__(self, version, render):
+        self.version = version
+        self.render = render
+        self.cached = None
+
+    def get(self):
+        version = self.version.get()
+        if self.cached is None or self.cached[0] != version:
+            count_cache(f'{self.version.name}_json', hits=0, misses=1)
+            content = JSONRenderer().render(self.render())
+            etag = f'"{hashlib.sha256(content).hexdigest()}"'
+            self.cached = (version, content, etag)
+        else:
+            count_cache(f'{self.version.name}_json', hits=1)
+        return self.cached[1:]
+
+    def response(self, request):
+        content, etag = self.get()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.CATALOG_CACHE_MAX_AGE,
+            must_revalidate=True,
+        )
+        return response
@@ -0,0 +1,27 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class FileRenderer(BaseRenderer):
+    """Рендерер для уже готовых файлов, ошибки отдаёт в виде JSON."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return JSONRenderer().render(
+            data, accepted_media_type, renderer_context
+        )
+
+
+class PDFRenderer(FileRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class PlainTextRenderer(FileRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(FileRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
@@ -1,13 +1,30 @@
+from collections import OrderedDict
+from copy import copy
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserSerializer as UserSerializerDjango
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
-from api.serializers_mixins import UserMixinSerializer
+from api.fields import BulkManyRelatedField, LimitedImageField
+from api.fragments import ViewerState, fragment_cache
+from api.serializers_mixins import RecipeImageMixin, UserMixinSerializer
+from api.utils import get_recipes_limit
 from api.validators import valid_image
-from recipe.models import Ingredient, Recipe, RecipeIngredient, Tag
+from jobs.models import Job
+from recipe.models import (
+    Ingredient,
+    ReciepeShopList,
+    Recipe,
+    RecipeIngredient,
+    ShopListIngredient,
+    Tag,
+)
 from user.models import UserFollowing
 
 
@@ -70,8 +87,31 @@ class UserSerializer(UserSerializerDjango, UserMixinSerializer):
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Сериализитор для рецептов для показа."""
+class RecipeListSerializer(serializers.ListSerializer):
+    """Сериализитор списка рецептов, который показывает их пачкой."""
+
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, Manager) else data
+        return self.child.to_representation_many(list(recipes))
+
+
+class RecipeSerializer(RecipeImageMixin):
+    """Сериализитор для рецептов для показа.
+
+    Независимая от зрителя часть рецепта берётся из fragment_cache,
+    поля из viewer_fields сериализуются на каждый запрос. Только что
+    записанные ингредиенты и теги передаются в
+    context['written_relations'] по id рецепта и не читаются заново.
+    """
+
+    viewer_fields = (
+        'author',
+        'image',
+        'image_thumb',
+        'image_variants',
+        'is_favorited',
+        'is_in_shopping_cart',
+    )
 
     image = Base64ImageField()
     tags = TagSerializer(many=True,)
@@ -81,6 +121,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     is_favorited = serializers.BooleanField(default=False)
     is_in_shopping_cart = serializers.BooleanField(default=False)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -93,19 +134,92 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_thumb',
+            'image_variants',
             'text',
             'cooking_time',
         )
         read_only_fields = ('id', 'author')
+        list_serializer_class = RecipeListSerializer
+
+    def get_image_variants(self, obj):
+        return {
+            variant: self.get_image_url(obj, variant)
+            for variant in obj.image_variants
+            if variant != 'source'
+        }
+
+    def render_fields(self, recipe, field_names):
+        written = self.context.get('written_relations', {}).get(recipe.pk, {})
+        data = {}
+        for field in self._readable_fields:
+            if field.field_name not in field_names:
+                continue
+            if field.field_name in written:
+                attribute = written[field.field_name]
+            else:
+                attribute = field.get_attribute(recipe)
+            data[field.field_name] = (
+                None if attribute is None
+                else field.to_representation(attribute)
+            )
+        return data
+
+    def to_representation(self, instance):
+        return self.to_representation_many([instance])[0]
+
+    def to_representation_many(self, recipes):
+        bodies, versions = fragment_cache.get_many(recipes)
+        misses = [recipe for recipe in recipes if recipe.pk not in bodies]
+        if misses:
+            written = self.context.get('written_relations', {})
+            prefetch_related_objects(
+                [recipe for recipe in misses if recipe.pk not in written],
+                Prefetch(
+                    'ingredients_with_amount',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient'
+                    ),
+                ),
+                'tags',
+            )
+            body_fields = set(self.Meta.fields).difference(
+                self.viewer_fields
+            )
+            rendered = {
+                recipe.pk: self.render_fields(recipe, body_fields)
+                for recipe in misses
+            }
+            fragment_cache.set_many(rendered, versions)
+            bodies.update(rendered)
+        request = self.context.get('request')
+        state = ViewerState(
+            getattr(request, 'user', AnonymousUser()), recipes
+        )
+        data = []
+        for recipe in recipes:
+            state.apply(recipe)
+            representation = {
+                **bodies[recipe.pk],
+                **self.render_fields(recipe, self.viewer_fields),
+            }
+            data.append(
+                OrderedDict(
+                    (name, representation[name]) for name in self.Meta.fields
+                )
+            )
+        return data
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(RecipeImageMixin):
     """Сериализитор для показа "коротких" рецептов."""
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
-        read_only_fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_thumb', 'cooking_time')
+        read_only_fields = (
+            'id', 'name', 'image', 'image_thumb', 'cooking_time'
+        )
 
 
 class CreateIngredientSerializer(serializers.ModelSerializer):
@@ -128,7 +242,14 @@ class CreateIngredientSerializer(serializers.ModelSerializer):
 class CreateRecipeSerializer(serializers.ModelSerializer):
     """Сериализитор для рецептов на запись."""
 
-    image = Base64ImageField(validators=[valid_image])
+    image = LimitedImageField(validators=[valid_image])
+    tags = BulkManyRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=Tag.objects.all()
+        ),
+        allow_empty=False,
+        help_text='Список id тегов',
+    )
     ingredients = CreateIngredientSerializer(many=True, required=True)
     author = UserSerializer(read_only=True)
 
@@ -156,19 +277,16 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             )
         if len(data.get('tags')) != len(set(data.get('tags'))):
             raise serializers.ValidationError('Теги не могут дублироваться.')
-        ingredients_ids_from_db = set(
-            Ingredient.objects.values_list('id', flat=True)
-        )
-        ingredient_ids = []
-        for ingredient in data.get('ingredients'):
-            if ingredient.get('id') not in ingredients_ids_from_db:
-                raise serializers.ValidationError('Ингредиент не существует.')
-            ingredient_ids.append(ingredient.get('id'))
+        ingredient_ids = [
+            ingredient.get('id') for ingredient in data.get('ingredients')
+        ]
+        prepared_ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        if len(prepared_ingredients) != len(set(ingredient_ids)):
+            raise serializers.ValidationError('Ингредиент не существует.')
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise serializers.ValidationError(
                 'Ингрединты не могут дублироваться.'
             )
-        prepared_ingredients = Ingredient.objects.filter(id__in=ingredient_ids)
         data['prepared_ingredients'] = prepared_ingredients
         return data
 
@@ -176,12 +294,12 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
     def set_ingredients_and_tags(
         self, recipe, ingredients, prepared_ingredients, tags
     ):
-        recipe.tags.set(tags)
-        RecipeIngredient.objects.bulk_create(
+        recipe.tags.add(*tags)
+        return RecipeIngredient.objects.bulk_create(
             [
                 RecipeIngredient(
                     recipe=recipe,
-                    ingredient=prepared_ingredients.get(pk=ingredient['id']),
+                    ingredient=prepared_ingredients[ingredient['id']],
                     amount=ingredient['amount'],
                 )
                 for ingredient in ingredients
@@ -194,40 +312,128 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         prepared_ingredients = validated_data.pop('prepared_ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        self.set_ingredients_and_tags(
+        ingredients_with_amount = self.set_ingredients_and_tags(
             recipe=recipe,
             ingredients=ingredients,
             prepared_ingredients=prepared_ingredients,
             tags=tags,
         )
+        Recipe.with_params.filter(pk=recipe.pk).update_search_index()
+        self.written_relations = {
+            'ingredients': ingredients_with_amount,
+            'tags': sorted(tags, key=lambda tag: tag.name),
+        }
+        recipe.is_favorited = False
+        recipe.is_in_shopping_cart = False
+        # Автор нового рецепта — это request.user, отметка ставится
+        # на копию, чтобы не менять пользователя запроса.
+        recipe.author = copy(recipe.author)
+        recipe.author.is_subscribed = False
         return recipe
 
+    @transaction.atomic
+    def update_ingredients(self, recipe, ingredients, prepared_ingredients):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.ingredients_with_amount.all()
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_delete = current.keys() - amounts.keys()
+        to_update = []
+        to_create = []
+        shop_list_changes = {
+            ingredient_id: (-current[ingredient_id].amount, -1)
+            for ingredient_id in to_delete
+        }
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient is None:
+                to_create.append(
+                    RecipeIngredient(
+                        recipe=recipe,
+                        ingredient=prepared_ingredients[ingredient_id],
+                        amount=amount,
+                    )
+                )
+                shop_list_changes[ingredient_id] = (amount, 1)
+                continue
+            recipe_ingredient.ingredient = prepared_ingredients[ingredient_id]
+            if recipe_ingredient.amount != amount:
+                shop_list_changes[ingredient_id] = (
+                    amount - recipe_ingredient.amount, 0
+                )
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+        if to_delete:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=to_delete
+            ).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ('amount',))
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        if shop_list_changes:
+            ShopListIngredient.objects.apply_changes(
+                user_ids=ReciepeShopList.objects.filter(
+                    recipe=recipe
+                ).values_list('user_id', flat=True),
+                changes=shop_list_changes,
+            )
+        return [
+            recipe_ingredient
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in to_delete
+        ] + to_create, bool(shop_list_changes)
+
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients', [])
         prepared_ingredients = validated_data.pop('prepared_ingredients')
         tags = validated_data.pop('tags', [])
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
-        )
-        instance.image = validated_data.get('image', instance.image)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.set_ingredients_and_tags(
-            recipe=instance,
-            ingredients=ingredients,
-            prepared_ingredients=prepared_ingredients,
-            tags=tags,
+        update_fields = []
+        for field in ('name', 'text', 'cooking_time', 'image'):
+            if (
+                field in validated_data
+                and getattr(instance, field) != validated_data[field]
+            ):
+                setattr(instance, field, validated_data[field])
+                update_fields.append(field)
+        ingredients_with_amount, ingredients_changed = (
+            self.update_ingredients(
+                recipe=instance,
+                ingredients=ingredients,
+                prepared_ingredients=prepared_ingredients,
+            )
         )
-        instance.save()
+        tags_changed = {tag.pk for tag in instance.tags.all()} != {
+            tag.pk for tag in tags
+        }
+        if tags_changed:
+            instance.tags.set(tags)
+        if update_fields or ingredients_changed or tags_changed:
+            instance.save(update_fields=update_fields + ['updated'])
+            fragment_cache.invalidate(instance.pk)
+        if {'name', 'text'}.intersection(update_fields):
+            Recipe.with_params.filter(pk=instance.pk).update_search_index()
+        self.written_relations = {
+            'ingredients': ingredients_with_amount,
+            'tags': sorted(tags, key=lambda tag: tag.name),
+        }
         return instance
 
     def to_representation(self, instance):
         if not isinstance(instance, Recipe):
             raise Exception('Неожиданный инстанс!')
-        instance = self.context['view'].get_queryset().get(id=instance.pk)
-        serializer = RecipeSerializer(instance, context=self.context)
+        context = self.context
+        if hasattr(self, 'written_relations'):
+            context = {
+                **context,
+                'written_relations': {instance.pk: self.written_relations},
+            }
+        serializer = RecipeSerializer(instance, context=context)
         return serializer.data
 
 
@@ -261,21 +467,19 @@ class UserSubscribeSerializer(UserSerializerDjango, UserMixinSerializer):
         )
 
     def get_recipes(self, obj):
-        user = get_object_or_404(User, pk=obj.pk)
-        recipes_limit = self.context.get('request').GET.get('recipes_limit')
-        all_recipes = user.recipies.all()
-        if recipes_limit:
-            recipes_limit = int(recipes_limit)
-            if recipes_limit > all_recipes.count():
-                recipes_limit = all_recipes.count()
-            recipes = all_recipes[:recipes_limit]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
         else:
-            recipes = all_recipes
+            recipes = obj.recipies.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return ShortRecipeSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
-        user = get_object_or_404(User, pk=obj.pk)
-        return user.recipies.count()
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipies.count()
 
     @transaction.atomic
     def create(self, validated_data):
@@ -301,3 +505,31 @@ class UserSubscribeSerializer(UserSerializerDjango, UserMixinSerializer):
         data['user_to_follow'] = user_to_follow
         data['user'] = user
         return data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализитор для фоновых задач."""
+
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id',
+            'kind',
+            'status',
+            'error',
+            'created',
+            'finished',
+            'download_url',
+        )
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != Job.Status.DONE:
+            return None
+        return reverse(
+            'jobs-download',
+            kwargs={'pk': obj.pk},
+            request=self.context.get('request'),
+        )
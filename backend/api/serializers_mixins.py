@@ -17,9 +17,28 @@ class UserMixinSerializer(serializers.ModelSerializer):
         fields = 'all'
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if not user.is_authenticated:
             return False
         return UserFollowing.objects.filter(
             user=obj, following_user=user
         ).exists()
+
+
+class RecipeImageMixin(serializers.ModelSerializer):
+    """Миксин с уменьшенными копиями картинки рецепта."""
+
+    image_thumb = serializers.SerializerMethodField()
+
+    def get_image_url(self, obj, variant):
+        name = obj.image_variants.get(variant)
+        url = obj.image.storage.url(name) if name else obj.image.url
+        request = self.context.get('request')
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+    def get_image_thumb(self, obj):
+        return self.get_image_url(obj, 'thumb')
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError
+
+
+NORMALIZE_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'"s\d+_x\d+"'), '"s?"'),
+    (re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """Нормализованный SQL и его отпечаток.
+
+    Литералы, номера savepoint и списки параметров в IN сворачиваются,
+    чтобы один и тот же запрос с разными данными давал один отпечаток.
+    """
+    normalized = sql.strip()
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        normalized = pattern.sub(replacement, normalized)
+    return normalized, hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def explain(connection, sql, params):
+    """План запроса: EXPLAIN ANALYZE в Postgres, QUERY PLAN в SQLite.
+
+    Выполняется отдельным курсором в обход execute_wrapper. Внутри
+    транзакции Postgres план снимается в savepoint, чтобы ошибка
+    EXPLAIN не сломала транзакцию запроса.
+    """
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return None
+    savepoint = (
+        connection.vendor == 'postgresql' and connection.in_atomic_block
+    )
+    cursor = connection.create_cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        except DatabaseError as error:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            return f'EXPLAIN не удался: {error}'
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+    if connection.vendor == 'sqlite':
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(row[0] for row in rows)
+
+
+class SlowQueryLog:
+    """Медленные запросы процесса, сгруппированные по отпечатку.
+
+    Каждый процесс пишет свою сводку в SLOW_QUERY_DIR/<pid>.json,
+    отчёт объединяет файлы всех процессов. План запроса снимается
+    не чаще раза в SLOW_QUERY_EXPLAIN_INTERVAL на отпечаток.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    @property
+    def directory(self):
+        return Path(settings.SLOW_QUERY_DIR)
+
+    def record(self, connection, sql, params, duration_ms, view):
+        normalized, digest = fingerprint(sql)
+        entry = self.entries.get(digest)
+        if entry is None:
+            if len(self.entries) >= settings.SLOW_QUERY_MAX_FINGERPRINTS:
+                return
+            entry = self.entries[digest] = {
+                'sql': normalized,
+                'count': 0,
+                'total_ms': 0,
+                'max_ms': 0,
+                'views': {},
+                'plan': None,
+                'explained_at': 0,
+            }
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['max_ms'] = max(entry['max_ms'], duration_ms)
+        entry['views'][view] = entry['views'].get(view, 0) + 1
+        now = time.time()
+        if (
+            now - entry['explained_at'] >= settings.SLOW_QUERY_EXPLAIN_INTERVAL
+            and sql.lstrip()[:6].upper() in ('SELECT', 'WITH')
+        ):
+            entry['explained_at'] = now
+            entry['plan'] = explain(connection, sql, params)
+            entry['plan_ms'] = duration_ms
+        self.flush()
+
+    def flush(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=self.directory, prefix='.'
+        )
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self.entries, file, ensure_ascii=False)
+        os.replace(temp_path, self.directory / f'{os.getpid()}.json')
+
+    def load(self):
+        """Сводка всех процессов, самые затратные запросы первыми."""
+        merged = {}
+        for path in self.directory.glob('*.json'):
+            try:
+                entries = json.loads(path.read_text())
+            except (FileNotFoundError, ValueError):
+                continue
+            for digest, entry in entries.items():
+                total = merged.setdefault(digest, {
+                    'fingerprint': digest,
+                    'sql': entry['sql'],
+                    'count': 0,
+                    'total_ms': 0,
+                    'max_ms': 0,
+                    'views': {},
+                    'plan': None,
+                    'explained_at': 0,
+                })
+                total['count'] += entry['count']
+                total['total_ms'] += entry['total_ms']
+                total['max_ms'] = max(total['max_ms'], entry['max_ms'])
+                for view, count in entry['views'].items():
+                    total['views'][view] = (
+                        total['views'].get(view, 0) + count
+                    )
+                if entry['plan'] and (
+                    entry['explained_at'] > total['explained_at']
+                ):
+                    total['plan'] = entry['plan']
+                    total['plan_ms'] = entry['plan_ms']
+                    total['explained_at'] = entry['explained_at']
+        return sorted(merged.values(), key=lambda entry: -entry['total_ms'])
+
+    def clear(self):
+        self.entries = {}
+        for path in self.directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+
+
+slow_query_log = SlowQueryLog()
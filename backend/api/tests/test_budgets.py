@@ -0,0 +1,54 @@
+import tempfile
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from benchmarks.runner import budget_coverage, check_budget, isolated_files
+from benchmarks.scenarios import BUDGET_SCENARIOS, Context
+
+
+class BudgetCoverageTest(SimpleTestCase):
+    def test_every_route_has_checked_budget(self):
+        self.assertEqual(budget_coverage(), [])
+
+
+class QueryBudgetTest(TransactionTestCase):
+    """Бюджеты SQL-запросов из api.budgets на маленькой базе.
+
+    Та же проверка, что и в команде check_query_budgets. Транзакции
+    настоящие, как в проде: в TestCase atomic превращается в savepoint,
+    а on_commit не вызывается. На SQLite BEGIN считается запросом,
+    поэтому в Postgres запросов столько же или меньше. Время SQL
+    сверяет только команда: в тестах оно зависит от машины.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        files = isolated_files(directory.name)
+        files.enable()
+        self.addCleanup(files.disable)
+        call_command(
+            'generate_fake_data',
+            users=30,
+            ingredients=200,
+            seed=1,
+            processes=1,
+            stdout=StringIO(),
+        )
+        for cache in caches.all():
+            cache.clear()
+
+    def test_routes_fit_budgets(self):
+        context = Context.load()
+        failures = []
+        for iteration, scenario in enumerate(BUDGET_SCENARIOS):
+            _, _, failure = check_budget(
+                scenario, context, iteration, timing=False
+            )
+            if failure:
+                failures.append(failure)
+        if failures:
+            self.fail('\n\n'.join(failures))
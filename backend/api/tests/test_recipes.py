@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.fragments import fragment_cache
+from recipe.models import (
+    Ingredient,
+    ReciepeShopList,
+    Recipe,
+    RecipeFavourite,
+    RecipeIngredient,
+    Tag,
+)
+from user.models import UserFollowing
+
+
+User = get_user_model()
+
+RECIPES = 8
+
+
+class RecipeQueryCountTest(APITestCase):
+    """Число SQL-запросов ленты и страницы рецепта.
+
+    Не зависит от количества рецептов на странице: ингредиенты, теги,
+    авторы, избранное, корзина и подписки грузятся пачками.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        cls.token = Token.objects.create(user=cls.reader)
+        UserFollowing.objects.create(
+            user=cls.author, following_user=cls.reader
+        )
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {number}',
+                color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(5)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author if number % 2 else cls.reader,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/test.png',
+            )
+            for number in range(RECIPES)
+        ]
+        for recipe in cls.recipes:
+            recipe.tags.set(tags[:2])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=2
+                )
+                for ingredient in ingredients[:3]
+            )
+        RecipeFavourite.objects.create(user=cls.reader, recipe=cls.recipes[1])
+        ReciepeShopList.objects.create(user=cls.reader, recipe=cls.recipes[1])
+
+    def setUp(self):
+        fragment_cache.cache.clear()
+
+    def get(self, path, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_list_anonymous(self):
+        # count, рецепты, ингредиенты, теги
+        data = self.get('/api/recipes/', 4)
+        self.assertEqual(len(data['results']), RECIPES)
+        # с прогретым кешем только count и рецепты
+        self.get('/api/recipes/', 2)
+
+    def test_list_authenticated(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        # + токен, избранное, корзина и подписки зрителя
+        data = self.get('/api/recipes/', 8)
+        recipe = next(
+            recipe for recipe in data['results']
+            if recipe['id'] == self.recipes[1].pk
+        )
+        self.assertTrue(recipe['is_favorited'])
+        self.assertTrue(recipe['is_in_shopping_cart'])
+        self.assertTrue(recipe['author']['is_subscribed'])
+        self.get('/api/recipes/', 6)
+
+    def test_detail_anonymous(self):
+        path = f'/api/recipes/{self.recipes[1].pk}/'
+        self.get(path, 3)
+        self.get(path, 1)
+
+    def test_detail_authenticated(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        path = f'/api/recipes/{self.recipes[1].pk}/'
+        data = self.get(path, 7)
+        self.assertTrue(data['is_favorited'])
+        self.assertTrue(data['author']['is_subscribed'])
+        self.get(path, 5)
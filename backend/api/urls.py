@@ -3,9 +3,11 @@ from rest_framework.routers import DefaultRouter
 
 from api.views import (
     IngredientViewSet,
+    JobViewSet,
     RecipeViewSet,
     SubscribeView,
     TagViewSet,
+    UserViewSet,
 )
 
 
@@ -14,6 +16,8 @@ router_v1 = DefaultRouter()
 router_v1.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register(r'tags', TagViewSet, basename='tags')
 router_v1.register(r'recipes', RecipeViewSet, basename='recipies')
+router_v1.register(r'users', UserViewSet, basename='users')
+router_v1.register(r'jobs', JobViewSet, basename='jobs')
 
 urlpatterns = [
     path(
@@ -23,6 +27,5 @@ urlpatterns = [
         'users/<int:pk>/subscribe/', SubscribeView.as_view(), name='subscribe'
     ),
     path('', include(router_v1.urls)),
-    path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
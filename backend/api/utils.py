@@ -1,27 +1,62 @@
+import csv
+import hashlib
+import json
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
 from io import BytesIO
 
 from django.conf import settings
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 from rest_framework import status
 
+from api.file_cache import FileLRUCache
+from api.metrics import PDF_RENDER_DURATION, count_cache
 
-def generate_pdf_file_response(items: set[str, str, float]) -> FileResponse:
-    """Функция для генерации pdf."""
-    buffer = BytesIO()
-    pdf_canvas = canvas.Canvas(buffer)
+
+PDF_LAYOUT_VERSION = '1'
+
+pdf_cache = FileLRUCache(
+    directory=lambda: settings.SHOPPING_LIST_CACHE_DIR,
+    max_size=settings.SHOPPING_LIST_CACHE_MAX_SIZE,
+    suffix='.pdf',
+)
+
+
+def get_recipes_limit(request) -> int | None:
+    """Функция для получения параметра recipes_limit из запроса."""
+    recipes_limit = request.query_params.get('recipes_limit')
+    try:
+        recipes_limit = int(recipes_limit)
+    except (TypeError, ValueError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
+@lru_cache(maxsize=None)
+def register_fonts() -> None:
+    """Регистрирует шрифт один раз на процесс."""
     pdfmetrics.registerFont(
         TTFont('Verdana', str(settings.FONTS_DIR) + '/' + 'Verdana.ttf')
     )
+
+
+@PDF_RENDER_DURATION.time()
+def render_pdf(items: list[tuple[str, str, float]]) -> bytes:
+    """Функция для генерации pdf."""
+    register_fonts()
+    buffer = BytesIO()
+    pdf_canvas = canvas.Canvas(buffer)
     pdf_canvas.setFont('Verdana', 11)
     pdf_canvas.drawString(250, 750, 'Shopping Cart')
     pdf_canvas.setFont('Verdana', 9)
     pdf_canvas.drawString(0, 720, '—' * 80)
     page_number = 1
     y = 700
-    for name, value, amount in sorted(items):
+    for name, value, amount in items:
         pdf_canvas.drawString(100, y, f'{name} ({value}) — {amount}')
         y -= 20
         if y < 50:
@@ -30,12 +65,6 @@ def generate_pdf_file_response(items: set[str, str, float]) -> FileResponse:
                 0, 30, f'{"—"*23}End of the page {page_number}{"—"*23}'
             )
             pdf_canvas.showPage()
-            pdfmetrics.registerFont(
-                TTFont(
-                    'Verdana', str(settings.FONTS_DIR) + '/' + 'Verdana.ttf'
-                )
-            )
-            pdf_canvas.setFont('Verdana', 11)
             pdf_canvas.setFont('Verdana', 9)
             y = 750
     pdf_canvas.setFont('Verdana', 11)
@@ -44,10 +73,90 @@ def generate_pdf_file_response(items: set[str, str, float]) -> FileResponse:
     pdf_canvas.drawString(480, 10, 'Produced by Foodgram')
     pdf_canvas.showPage()
     pdf_canvas.save()
-    buffer.seek(0)
-    return FileResponse(
-        buffer,
-        as_attachment=True,
-        filename='shopping_cart.pdf',
-        status=status.HTTP_200_OK,
+    return buffer.getvalue()
+
+
+def shopping_cart_key(items: list[tuple[str, str, float]]) -> str:
+    """Хеш содержимого списка покупок."""
+    digest = hashlib.sha256(PDF_LAYOUT_VERSION.encode())
+    for item in items:
+        digest.update(repr(item).encode())
+    return digest.hexdigest()
+
+
+def generate_pdf_file_response(
+    request, items: Iterable[tuple[str, str, float]]
+) -> HttpResponse:
+    """Функция для ответа с pdf, закешированным по содержимому."""
+    items = sorted(items)
+    key = shopping_cart_key(items)
+    etag = f'"{key}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content = pdf_cache.get(key)
+        if content is None:
+            count_cache('shopping_list_pdf', hits=0, misses=1)
+            content = render_pdf(items)
+            pdf_cache.set(key, content)
+        else:
+            count_cache('shopping_list_pdf', hits=1)
+        response = FileResponse(
+            BytesIO(content),
+            as_attachment=True,
+            filename='shopping_cart.pdf',
+            status=status.HTTP_200_OK,
+        )
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class _Echo:
+    """Буфер для csv.writer, который сразу возвращает записанное."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _txt_lines(items: Iterable[tuple[str, str, float]]) -> Iterator[str]:
+    for name, value, amount in items:
+        yield f'{name} ({value}) — {amount}\n'
+
+
+def _csv_lines(items: Iterable[tuple[str, str, float]]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in items:
+        yield writer.writerow(item)
+
+
+def _json_lines(items: Iterable[tuple[str, str, float]]) -> Iterator[str]:
+    separator = '['
+    for name, value, amount in items:
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': value, 'amount': amount},
+            ensure_ascii=False,
+        )
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+STREAM_FORMATS = {
+    'txt': (_txt_lines, 'text/plain; charset=utf-8'),
+    'csv': (_csv_lines, 'text/csv; charset=utf-8'),
+    'json': (_json_lines, 'application/json'),
+}
+
+
+def generate_stream_file_response(
+    items: Iterable[tuple[str, str, float]], file_format: str
+) -> StreamingHttpResponse:
+    """Функция для потоковой выдачи списка покупок в текстовом формате."""
+    lines, content_type = STREAM_FORMATS[file_format]
+    response = StreamingHttpResponse(
+        (line.encode() for line in lines(items)), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_cart.{file_format}"'
     )
+    return response
@@ -1,45 +1,83 @@
+import os
+
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as filters
+from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import generics, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
 from api.filters import IngredientFilter, RecipeFilter
+from api.fragments import fragment_cache
+from api.paginations import RecipePagination
+from api.parsers import MultiPartJSONParser
 from api.permissions import IsAuthorOrReadOnly
+from api.precomputed import PrecomputedJSON
+from api.renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
 from api.serializers import (
     CreateRecipeSerializer,
     IngredientSerializer,
+    JobSerializer,
     RecipeSerializer,
     ShortRecipeSerializer,
     TagSerializer,
     UserSubscribeSerializer,
 )
-from api.utils import generate_pdf_file_response
+from api.utils import (
+    STREAM_FORMATS,
+    generate_pdf_file_response,
+    generate_stream_file_response,
+    get_recipes_limit,
+)
 from api.views_mixins import RelationMixin
+from jobs.models import Job
+from recipe.ingredient_index import ingredient_index
 from recipe.models import (
     Ingredient,
     ReciepeShopList,
     Recipe,
     RecipeFavourite,
+    ShopListIngredient,
     Tag,
 )
+from recipe.versions import ingredients_version, tags_version
 from user.models import UserFollowing
 
 
 User = get_user_model()
 
 
+class UserViewSet(DjoserUserViewSet):
+    """Вьюсет для пользователей."""
+
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(
+            user=self.request.user
+        )
+
+
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тэгов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    precomputed = PrecomputedJSON(
+        version=tags_version,
+        render=lambda: TagSerializer(Tag.objects.all(), many=True).data,
+    )
+
+    def list(self, request, *args, **kwargs):
+        return self.precomputed.response(request)
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -50,6 +88,21 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = IngredientFilter
+    precomputed = PrecomputedJSON(
+        version=ingredients_version,
+        render=lambda: IngredientSerializer(
+            Ingredient.objects.all(), many=True
+        ).data,
+    )
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return self.precomputed.response(request)
+        try:
+            return Response(ingredient_index.search(name))
+        except OSError:
+            return super().list(request, *args, **kwargs)
 
 
 class RecipeViewSet(viewsets.ModelViewSet, RelationMixin):
@@ -59,21 +112,28 @@ class RecipeViewSet(viewsets.ModelViewSet, RelationMixin):
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
+    pagination_class = RecipePagination
+    parser_classes = (JSONParser, MultiPartJSONParser)
+    multipart_json_fields = ('tags', 'ingredients')
 
     def get_queryset(self):
-
-        return Recipe.with_params.with_shopcart_and_favorite(
-            user=self.request.user
-        )
+        queryset = Recipe.with_params.select_related('author')
+        if self.action in ('list', 'retrieve'):
+            return queryset
+        return queryset.with_shopcart_and_favorite(user=self.request.user)
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrive'):
+        if self.action in ('list', 'retrieve'):
             return RecipeSerializer
         return CreateRecipeSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        fragment_cache.invalidate(instance.pk)
+        instance.delete()
+
     @action(
         methods=('post',),
         detail=True,
@@ -88,16 +148,37 @@ class RecipeViewSet(viewsets.ModelViewSet, RelationMixin):
         return self.delete_relation(request, ReciepeShopList)
 
     @action(
-        methods=('get',), detail=False, permission_classes=(IsAuthenticated,),
+        methods=('get', 'post'),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            JSONRenderer,
+            PDFRenderer,
+            PlainTextRenderer,
+            CSVRenderer,
+        ),
     )
     def download_shopping_cart(self, request, pk=None):
         if not request.user.is_authenticated:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        ingredients = ReciepeShopList.ingredients.all_ingredients(
+        if request.method == 'POST':
+            job = Job.objects.create(
+                user=request.user, kind='shopping_list_pdf'
+            )
+            return Response(
+                JobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
+        file_format = request.query_params.get('format') or 'pdf'
+        ingredients = ShopListIngredient.objects.all_ingredients(
             user=request.user
         )
-        ingredients = set(ingredients)
-        return generate_pdf_file_response(items=ingredients)
+        if file_format in STREAM_FORMATS:
+            return generate_stream_file_response(
+                items=ingredients.order_by('ingredient__name').iterator(),
+                file_format=file_format,
+            )
+        return generate_pdf_file_response(request=request, items=ingredients)
 
     @action(
         methods=('post',),
@@ -113,6 +194,30 @@ class RecipeViewSet(viewsets.ModelViewSet, RelationMixin):
         return self.delete_relation(request, RecipeFavourite)
 
 
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Вьюсет для фоновых задач пользователя."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.request.user.jobs.all()
+
+    @action(methods=('get',), detail=True)
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.Status.DONE:
+            return Response(
+                {'errors': 'Задача ещё не выполнена.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(
+            job.result.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.result.name),
+        )
+
+
 class SubscribeView(
     generics.ListAPIView, generics.CreateAPIView, generics.DestroyAPIView
 ):
@@ -123,7 +228,27 @@ class SubscribeView(
 
     def get_queryset(self):
         user = self.request.user
-        return user.followers.all()
+        return user.followers.with_is_subscribed(
+            user=user
+        ).with_recipes_count()
+
+    def paginate_queryset(self, queryset):
+        authors = super().paginate_queryset(queryset)
+        if authors is None:
+            authors = list(queryset)
+        recipes_limit = get_recipes_limit(self.request)
+        if recipes_limit is None:
+            recipes = Recipe.objects.all()
+        else:
+            recipes = Recipe.with_params.first_per_author(
+                author_ids=[author.pk for author in authors],
+                limit=recipes_limit,
+            )
+        prefetch_related_objects(
+            authors,
+            Prefetch('recipies', queryset=recipes, to_attr='limited_recipes'),
+        )
+        return authors
 
     def destroy(self, request, *args, **kwargs):
         user = get_object_or_404(User, username=self.request.user.username)
@@ -0,0 +1,54 @@
+from typing import Any
+
+from django.core.cache import caches
+from django.core.management import BaseCommand, CommandError
+
+from benchmarks.runner import (
+    SCALES,
+    benchmark_database,
+    budget_coverage,
+    check_budget,
+)
+from benchmarks.scenarios import BUDGET_SCENARIOS, Context
+
+
+class Command(BaseCommand):
+    """Менеджмент команда для проверки бюджетов SQL-запросов.
+
+    Обходит каждый маршрут из api.budgets.BUDGETS по одному разу
+    с холодными кешами и падает со списком SQL, если маршрут
+    превысил бюджет. Маршруты api без бюджета тоже считаются ошибкой.
+    Та же проверка на маленькой базе идёт в api.tests.test_budgets.
+    """
+
+    help = 'Проверяет число и время SQL-запросов каждого маршрута API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        failures = budget_coverage()
+        with benchmark_database(
+            options['scale'], options['seed'], options['keepdb'], self.stdout
+        ):
+            for cache in caches.all():
+                cache.clear()
+            context = Context.load()
+            for iteration, scenario in enumerate(BUDGET_SCENARIOS):
+                budget, recorder, failure = check_budget(
+                    scenario, context, iteration
+                )
+                self.stdout.write(
+                    f'{scenario.name:34} {scenario.method.upper():6} '
+                    f'{len(recorder.queries):3}/{budget.queries:<3} '
+                    f'запросов  {recorder.sql_ms:7.2f}/{budget.sql_ms:<5} мс'
+                )
+                if failure:
+                    failures.append(failure)
+        if failures:
+            for failure in failures:
+                self.stderr.write(failure)
+            raise CommandError(f'Бюджеты превышены: {len(failures)}')
+        self.stdout.write('Все маршруты укладываются в бюджеты.')
@@ -0,0 +1,122 @@
+import json
+import platform
+from pathlib import Path
+from typing import Any
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from benchmarks.runner import (
+    SCALES,
+    benchmark_database,
+    compare,
+    run_scenario,
+)
+from benchmarks.scenarios import SCENARIOS, Context
+
+
+class Command(BaseCommand):
+    """Менеджмент команда для замера производительности API.
+
+    Создаёт временную тестовую базу, наполняет её generate_fake_data
+    в выбранном масштабе и прогоняет сценарии из benchmarks.scenarios
+    через тестовый клиент. Медиа и кеши пишутся во временный каталог.
+    """
+
+    help = 'Замеряет p50/p95, пропускную способность и память запросов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=[scenario.name for scenario in SCENARIOS],
+        )
+        parser.add_argument(
+            '--output', type=Path, help='Куда сохранить результаты в JSON.'
+        )
+        parser.add_argument(
+            '--baseline', type=Path, help='JSON с результатами для сравнения.'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимое замедление относительно baseline (0.2 = 20%%).',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Завершиться с ошибкой, если есть регрессии.',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Не удалять тестовую базу, чтобы не наполнять её заново.',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['iterations'] < 2:
+            raise CommandError('--iterations должен быть не меньше 2.')
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options['only'] or scenario.name in options['only']
+        ]
+        results = {}
+        with benchmark_database(
+            options['scale'], options['seed'], options['keepdb'], self.stdout
+        ):
+            context = Context.load()
+            for scenario in scenarios:
+                results[scenario.name] = run_scenario(
+                    scenario, context, options['iterations'], options['warmup']
+                )
+                self.report(scenario.name, results[scenario.name])
+        self.save_and_compare(results, options)
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:30} p50 {result["p50_ms"]:9.2f} ms  '
+            f'p95 {result["p95_ms"]:9.2f} ms  '
+            f'{result["throughput_rps"]:8.1f} rps  '
+            f'{result["queries"]:3} queries  '
+            f'alloc {result["peak_alloc_kb"]:.0f} KB'
+        )
+
+    def save_and_compare(self, results, options):
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(
+                    {
+                        'meta': {
+                            'created': timezone.now().isoformat(),
+                            'scale': options['scale'],
+                            'seed': options['seed'],
+                            'iterations': options['iterations'],
+                            'database': connection.vendor,
+                            'python': platform.python_version(),
+                        },
+                        'results': results,
+                    },
+                    indent=2,
+                    ensure_ascii=False,
+                )
+            )
+        if not options['baseline']:
+            return
+        baseline = json.loads(options['baseline'].read_text())
+        if baseline['meta']['scale'] != options['scale']:
+            self.stderr.write('Baseline снят в другом масштабе.')
+        regressions = compare(
+            results, baseline['results'], options['threshold']
+        )
+        for regression in regressions:
+            self.stderr.write(f'Регрессия: {regression}')
+        if not regressions:
+            self.stdout.write('Регрессий нет.')
+        elif options['fail_on_regression']:
+            raise CommandError(f'Регрессий: {len(regressions)}')
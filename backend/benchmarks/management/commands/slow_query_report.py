@@ -0,0 +1,61 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from api.slow_queries import slow_query_log
+
+
+class Command(BaseCommand):
+    """Менеджмент команда для отчёта о медленных запросах.
+
+    Запросы собирает SlowQueryMiddleware, отчёт отсортирован
+    по суммарному времени запросов с одинаковым отпечатком.
+    """
+
+    help = 'Печатает медленные SQL-запросы с их планами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--view', help='Только запросы этой вью.')
+        parser.add_argument(
+            '--no-plans', action='store_true', help='Не печатать планы.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true', help='Очистить собранное.'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['clear']:
+            slow_query_log.clear()
+            self.stdout.write('Отчёт очищен.')
+            return
+        entries = [
+            entry for entry in slow_query_log.load()
+            if not options['view'] or options['view'] in entry['views']
+        ]
+        if not entries:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        for rank, entry in enumerate(entries[:options['limit']], start=1):
+            views = ', '.join(
+                f'{view} ({count})'
+                for view, count in sorted(
+                    entry['views'].items(), key=lambda item: -item[1]
+                )
+            )
+            self.stdout.write(
+                f'{rank}. {entry["fingerprint"]}  '
+                f'всего {entry["total_ms"]:.0f} мс, '
+                f'{entry["count"]} раз, '
+                f'в среднем {entry["total_ms"] / entry["count"]:.1f} мс, '
+                f'максимум {entry["max_ms"]:.1f} мс\n'
+                f'   вью: {views}\n'
+                f'   {entry["sql"]}'
+            )
+            if entry['plan'] and not options['no_plans']:
+                self.stdout.write(
+                    f'   план (запрос шёл {entry["plan_ms"]:.1f} мс):'
+                )
+                for line in entry['plan'].splitlines():
+                    self.stdout.write(f'     {line}')
+            self.stdout.write('')
@@ -0,0 +1,221 @@
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.urls import URLResolver, get_resolver
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.budgets import BUDGETS, EXEMPT_ROUTES, QueryRecorder, get_budget
+from benchmarks.scenarios import BUDGET_SCENARIOS
+from recipe.models import Recipe
+
+
+SCALES = {
+    'small': {'users': 200},
+    'medium': {'users': 2000},
+    'large': {'users': 20000},
+}
+
+
+def isolated_files(directory):
+    """Переносит медиа и файловые кеши в directory."""
+    cache_dir = Path(directory) / 'cache'
+    return override_settings(
+        MEDIA_ROOT=Path(directory) / 'media',
+        CACHE_DIR=cache_dir,
+        INGREDIENT_INDEX_PATH=cache_dir / 'ingredient_index.bin',
+        SHOPPING_LIST_CACHE_DIR=cache_dir / 'shopping_lists',
+        SLOW_QUERY_DIR=cache_dir / 'slow_queries',
+    )
+
+
+@contextmanager
+def benchmark_database(scale, seed, keepdb, stdout):
+    """Временная тестовая база, наполненная generate_fake_data.
+
+    Медиа и файловые кеши на время работы пишутся во временный каталог.
+    """
+    old_name = connection.settings_dict['NAME']
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        with tempfile.TemporaryDirectory() as directory, isolated_files(
+            directory
+        ):
+            if not Recipe.objects.exists():
+                call_command(
+                    'generate_fake_data',
+                    seed=seed,
+                    processes=1,
+                    stdout=stdout,
+                    **SCALES[scale],
+                )
+            yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def client_for(scenario, context):
+    """Клиент с токеном пользователя сценария.
+
+    Токен проверяется TokenAuthentication, как в проде, поэтому его
+    запрос входит в замер.
+    """
+    client = APIClient()
+    if scenario.user:
+        token, _ = Token.objects.get_or_create(
+            user=getattr(context, scenario.user)
+        )
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def perform(client, scenario, context, iteration):
+    path = scenario.path(context, iteration)
+    data = scenario.data(context, iteration) if scenario.data else None
+    response = getattr(client, scenario.method)(path, data=data, format='json')
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f'{scenario.name}: {path} ответил {response.status_code}'
+        )
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def run_scenario(scenario, context, iterations, warmup):
+    """Замеряет сценарий: задержки, пропускную способность и запросы.
+
+    Первые warmup итераций прогревают кеши и не учитываются.
+    Следующая итерация идёт вне замера времени: по ней считаются
+    SQL-запросы и пик памяти Python, выделенной за запрос (tracemalloc
+    замедляет выполнение, поэтому в задержки не попадает).
+    """
+    client = client_for(scenario, context)
+    for iteration in range(warmup):
+        perform(client, scenario, context, iteration)
+    recorder = QueryRecorder()
+    tracemalloc.start()
+    try:
+        with recorder.record():
+            perform(client, scenario, context, warmup)
+        _, peak_alloc = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    timings = []
+    started = time.perf_counter()
+    for iteration in range(warmup + 1, warmup + 1 + iterations):
+        request_started = time.perf_counter()
+        perform(client, scenario, context, iteration)
+        timings.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+    percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'p50_ms': round(percentiles[49] * 1000, 3),
+        'p95_ms': round(percentiles[94] * 1000, 3),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'throughput_rps': round(iterations / elapsed, 1),
+        'queries': len(recorder.queries),
+        'peak_alloc_kb': round(peak_alloc / 1024, 1),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Сравнивает p50 и p95 с базовыми, возвращает строки регрессий."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if base[metric] and result[metric] > base[metric] * (
+                1 + threshold
+            ):
+                regressions.append(
+                    f'{name}.{metric}: {base[metric]} -> {result[metric]}'
+                )
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}.queries: {base["queries"]} -> {result["queries"]}'
+            )
+    return regressions
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def budget_coverage():
+    """Маршруты api без бюджета и бюджеты, которые не проверяются."""
+    names = set(route_names(get_resolver('api.urls').url_patterns))
+    budgeted = {name for name, _ in BUDGETS}
+    checked = {
+        (scenario.name, scenario.method.upper())
+        for scenario in BUDGET_SCENARIOS
+    }
+    return [
+        f'{name}: нет бюджета'
+        for name in sorted(names - budgeted - EXEMPT_ROUTES)
+    ] + [
+        f'{name} {method}: бюджет не проверяется'
+        for name, method in sorted(set(BUDGETS) - checked)
+    ]
+
+
+def check_budget(scenario, context, iteration, timing=True):
+    """Выполняет сценарий из BUDGET_SCENARIOS и сверяет его с бюджетом.
+
+    Возвращает бюджет, QueryRecorder запроса и описание проблемы:
+    ошибка ответа, чужой маршрут или превышение бюджета. timing=False
+    не сверяет время SQL, оно зависит от скорости машины.
+    """
+    if scenario.setup:
+        scenario.setup(context)
+    client = client_for(scenario, context)
+    method = scenario.method.upper()
+    path = scenario.path(context, iteration)
+    data = scenario.data(context, iteration) if scenario.data else None
+    recorder = QueryRecorder()
+    with recorder.record():
+        response = getattr(client, scenario.method)(
+            path, data=data, format='json'
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+    name = response.resolver_match.url_name
+    budget = get_budget(scenario.name, method)
+    if response.status_code >= 400:
+        return budget, recorder, (
+            f'{name} {method}: {path} ответил {response.status_code}'
+        )
+    if name != scenario.name:
+        return budget, recorder, (
+            f'{scenario.name} {method}: {path} ведёт в {name}'
+        )
+    problems = recorder.exceeded(budget, timing=timing)
+    if not problems:
+        return budget, recorder, None
+    return budget, recorder, (
+        f'{name} {method} {path}: {", ".join(problems)}\n'
+        f'{recorder.report()}'
+    )
@@ -0,0 +1,393 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+
+from api.budgets import PAGE_SIZE
+from jobs.models import Job
+from jobs.runner import execute_job
+from recipe.fake_data import PLACEHOLDER_IMAGE
+from recipe.models import Ingredient, Recipe, Tag
+
+
+User = get_user_model()
+
+IMAGE = f'data:image/png;base64,{PLACEHOLDER_IMAGE}'
+
+
+@dataclass
+class Context:
+    """Данные из базы, на которые ссылаются сценарии."""
+
+    reader: User
+    author: User
+    stranger: User
+    recipe_ids: list
+    own_recipe_id: int
+    ingredient_ids: list
+    ingredient_prefixes: list
+    tag_ids: list
+
+    @classmethod
+    def load(cls, sample_size=100):
+        reader = User.objects.annotate(
+            follows=Count('followed', distinct=True),
+            cart=Count('recipe_cart', distinct=True),
+        ).order_by('-follows', '-cart').first()
+        own_recipe = Recipe.objects.order_by('id').first()
+        stranger = User.objects.exclude(
+            pk__in=reader.followers.values('pk')
+        ).exclude(pk=reader.pk).order_by('id').first()
+        ingredients = list(
+            Ingredient.objects.order_by('id').values_list('id', 'name')[
+                :sample_size
+            ]
+        )
+        return cls(
+            reader=reader,
+            author=own_recipe.author,
+            stranger=stranger,
+            recipe_ids=list(
+                Recipe.objects.order_by('-id').values_list('id', flat=True)[
+                    :sample_size
+                ]
+            ),
+            own_recipe_id=own_recipe.pk,
+            ingredient_ids=[pk for pk, _ in ingredients],
+            ingredient_prefixes=sorted({name[:3] for _, name in ingredients}),
+            tag_ids=list(Tag.objects.values_list('id', flat=True)),
+        )
+
+    def recipe_id(self, iteration):
+        return self.recipe_ids[iteration % len(self.recipe_ids)]
+
+    def latest_own_recipe_id(self):
+        return Recipe.objects.filter(author=self.author).latest('id').pk
+
+    def latest_job_id(self):
+        return Job.objects.filter(user=self.reader).latest('created').pk
+
+    def recipe_payload(self, iteration):
+        ingredient_ids = self.ingredient_ids[
+            iteration % 10:iteration % 10 + 5
+        ]
+        return {
+            'tags': self.tag_ids[:1 + iteration % len(self.tag_ids)],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 1 + iteration % 7}
+                for ingredient_id in ingredient_ids
+            ],
+            'name': f'Бенчмарк {iteration}',
+            'text': 'Рецепт для замера производительности.',
+            'image': IMAGE,
+            'cooking_time': 1 + iteration % 60,
+        }
+
+
+@dataclass
+class Scenario:
+    """Один запрос к API, который повторяется при замере.
+
+    setup выполняется перед запросом и не входит в замер.
+    """
+
+    name: str
+    method: str
+    path: Callable[[Context, int], str]
+    user: Optional[str] = None
+    data: Optional[Callable[[Context, int], dict]] = None
+    setup: Optional[Callable[[Context], None]] = None
+
+
+SCENARIOS = (
+    Scenario(
+        name='recipe_list_anonymous',
+        method='get',
+        path=lambda context, iteration: '/api/recipes/?limit=6',
+    ),
+    Scenario(
+        name='recipe_list_authenticated',
+        method='get',
+        path=lambda context, iteration: '/api/recipes/?limit=6',
+        user='reader',
+    ),
+    Scenario(
+        name='recipe_detail_anonymous',
+        method='get',
+        path=lambda context, iteration: (
+            f'/api/recipes/{context.recipe_id(iteration)}/'
+        ),
+    ),
+    Scenario(
+        name='recipe_detail_authenticated',
+        method='get',
+        path=lambda context, iteration: (
+            f'/api/recipes/{context.recipe_id(iteration)}/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        name='recipe_create',
+        method='post',
+        path=lambda context, iteration: '/api/recipes/',
+        user='author',
+        data=lambda context, iteration: context.recipe_payload(iteration),
+    ),
+    Scenario(
+        name='recipe_update',
+        method='patch',
+        path=lambda context, iteration: (
+            f'/api/recipes/{context.own_recipe_id}/'
+        ),
+        user='author',
+        data=lambda context, iteration: context.recipe_payload(iteration),
+    ),
+    Scenario(
+        name='subscriptions',
+        method='get',
+        path=lambda context, iteration: (
+            '/api/users/subscriptions/?recipes_limit=3'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        name='ingredient_search',
+        method='get',
+        path=lambda context, iteration: '/api/ingredients/?name={}'.format(
+            context.ingredient_prefixes[
+                iteration % len(context.ingredient_prefixes)
+            ]
+        ),
+    ),
+    Scenario(
+        name='shopping_list_pdf',
+        method='get',
+        path=lambda context, iteration: (
+            '/api/recipes/download_shopping_cart/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        name='shopping_list_txt',
+        method='get',
+        path=lambda context, iteration: (
+            '/api/recipes/download_shopping_cart/?format=txt'
+        ),
+        user='reader',
+    ),
+)
+
+
+def finish_latest_job(context):
+    execute_job(context.latest_job_id())
+
+
+# Обходят все маршруты из api.budgets.BUDGETS по одному разу.
+# Порядок важен: удаление идёт после создания того же объекта.
+BUDGET_SCENARIOS = (
+    Scenario('api-root', 'get', lambda context, iteration: '/api/'),
+    Scenario(
+        'ingredients-list',
+        'get',
+        lambda context, iteration: (
+            f'/api/ingredients/?name={context.ingredient_prefixes[0]}'
+        ),
+    ),
+    Scenario(
+        'ingredients-detail',
+        'get',
+        lambda context, iteration: (
+            f'/api/ingredients/{context.ingredient_ids[0]}/'
+        ),
+    ),
+    Scenario('tags-list', 'get', lambda context, iteration: '/api/tags/'),
+    Scenario(
+        'tags-detail',
+        'get',
+        lambda context, iteration: f'/api/tags/{context.tag_ids[0]}/',
+    ),
+    Scenario(
+        'recipies-list',
+        'get',
+        lambda context, iteration: f'/api/recipes/?limit={PAGE_SIZE}',
+        user='reader',
+    ),
+    Scenario(
+        'recipies-detail',
+        'get',
+        lambda context, iteration: (
+            f'/api/recipes/{context.recipe_id(iteration)}/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'recipies-list',
+        'post',
+        lambda context, iteration: '/api/recipes/',
+        user='author',
+        data=lambda context, iteration: context.recipe_payload(iteration),
+    ),
+    Scenario(
+        'recipies-detail',
+        'patch',
+        lambda context, iteration: (
+            f'/api/recipes/{context.latest_own_recipe_id()}/'
+        ),
+        user='author',
+        data=lambda context, iteration: context.recipe_payload(
+            iteration + 1
+        ),
+    ),
+    Scenario(
+        'recipies-favorite',
+        'post',
+        lambda context, iteration: (
+            f'/api/recipes/{context.latest_own_recipe_id()}/favorite/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'recipies-favorite',
+        'delete',
+        lambda context, iteration: (
+            f'/api/recipes/{context.latest_own_recipe_id()}/favorite/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'recipies-shopping-cart',
+        'post',
+        lambda context, iteration: (
+            f'/api/recipes/{context.latest_own_recipe_id()}/shopping_cart/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'recipies-shopping-cart',
+        'delete',
+        lambda context, iteration: (
+            f'/api/recipes/{context.latest_own_recipe_id()}/shopping_cart/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'recipies-detail',
+        'delete',
+        lambda context, iteration: (
+            f'/api/recipes/{context.latest_own_recipe_id()}/'
+        ),
+        user='author',
+    ),
+    Scenario(
+        'recipies-download-shopping-cart',
+        'get',
+        lambda context, iteration: (
+            '/api/recipes/download_shopping_cart/?format=txt'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'recipies-download-shopping-cart',
+        'post',
+        lambda context, iteration: '/api/recipes/download_shopping_cart/',
+        user='reader',
+    ),
+    Scenario(
+        'jobs-list',
+        'get',
+        lambda context, iteration: f'/api/jobs/?limit={PAGE_SIZE}',
+        user='reader',
+    ),
+    Scenario(
+        'jobs-detail',
+        'get',
+        lambda context, iteration: f'/api/jobs/{context.latest_job_id()}/',
+        user='reader',
+    ),
+    Scenario(
+        'jobs-download',
+        'get',
+        lambda context, iteration: (
+            f'/api/jobs/{context.latest_job_id()}/download/'
+        ),
+        user='reader',
+        setup=finish_latest_job,
+    ),
+    Scenario(
+        'users-list',
+        'get',
+        lambda context, iteration: f'/api/users/?limit={PAGE_SIZE}',
+        user='reader',
+    ),
+    Scenario(
+        'users-list',
+        'post',
+        lambda context, iteration: '/api/users/',
+        data=lambda context, iteration: {
+            'email': f'budget{iteration}@example.com',
+            'username': f'budget{iteration}',
+            'first_name': 'Бюджет',
+            'last_name': 'Проверка',
+            'password': 'Budget-password-1',
+        },
+    ),
+    Scenario(
+        'users-detail',
+        'get',
+        lambda context, iteration: f'/api/users/{context.author.pk}/',
+        user='reader',
+    ),
+    Scenario(
+        'users-me', 'get', lambda context, iteration: '/api/users/me/',
+        user='reader',
+    ),
+    Scenario(
+        'subscriptions',
+        'get',
+        lambda context, iteration: (
+            f'/api/users/subscriptions/?limit={PAGE_SIZE}&recipes_limit=3'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'subscribe',
+        'post',
+        lambda context, iteration: (
+            f'/api/users/{context.stranger.pk}/subscribe/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'subscribe',
+        'delete',
+        lambda context, iteration: (
+            f'/api/users/{context.stranger.pk}/subscribe/'
+        ),
+        user='reader',
+    ),
+    Scenario(
+        'login',
+        'post',
+        lambda context, iteration: '/api/auth/token/login/',
+        data=lambda context, iteration: {
+            'email': context.reader.email, 'password': 'password'
+        },
+    ),
+    Scenario(
+        'logout',
+        'post',
+        lambda context, iteration: '/api/auth/token/logout/',
+        user='reader',
+    ),
+    Scenario(
+        'users-set-password',
+        'post',
+        lambda context, iteration: '/api/users/set_password/',
+        user='reader',
+        data=lambda context, iteration: {
+            'current_password': 'password',
+            'new_password': 'Budget-password-2',
+        },
+    ),
+)
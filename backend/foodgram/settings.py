@@ -25,6 +25,8 @@ INSTALLED_APPS = [
     # django apps
     'recipe.apps.RecipeConfig',
     'user.apps.UserConfig',
+    'jobs.apps.JobsConfig',
+    'benchmarks.apps.BenchmarksConfig',
 
     # 3rd party apps
     'djoser',
@@ -34,6 +36,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.RequestTimingMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
+    'api.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -124,10 +130,87 @@ DB_DATA_DIR = BASE_DIR / 'data'
 
 FONTS_DIR = BASE_DIR / 'media' / 'fonts'
 
+CACHE_DIR = Path(os.getenv('CACHE_DIR', BASE_DIR / 'cache'))
+
+INGREDIENT_INDEX_PATH = CACHE_DIR / 'ingredient_index.bin'
+
+INGREDIENT_INDEX_MAX_AGE = int(os.getenv('INGREDIENT_INDEX_MAX_AGE', 3600))
+
+CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', 0))
+
+SHOPPING_LIST_CACHE_DIR = CACHE_DIR / 'shopping_lists'
+
+SHOPPING_LIST_CACHE_MAX_SIZE = int(
+    os.getenv('SHOPPING_LIST_CACHE_MAX_SIZE', 64 * 1024 * 1024)
+)
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumb': (320, 320, 'WEBP'),
+    'thumb_jpeg': (320, 320, 'JPEG'),
+    'medium': (960, 960, 'WEBP'),
+}
+
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', 80))
+
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.getenv('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+)
+
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.getenv('RECIPE_IMAGE_MAX_PIXELS', 40_000_000)
+)
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 1024 * 1024)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipe_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recipe_fragments',
+        'TIMEOUT': int(os.getenv('RECIPE_FRAGMENT_CACHE_TIMEOUT', 3600)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.getenv('RECIPE_FRAGMENT_CACHE_MAX_ENTRIES', 10000)
+            ),
+        },
+    },
+}
+
+JOB_HANDLERS = {
+    'shopping_list_pdf': 'api.jobs.render_shopping_list_pdf',
+    'recipe_image_variants': 'recipe.jobs.generate_image_variants',
+}
+
+JOBS_PROCESSES = int(os.getenv('JOBS_PROCESSES', 0))
+
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+
+JOBS_STALE_TIMEOUT = int(os.getenv('JOBS_STALE_TIMEOUT', 600))
+
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 3))
+
+# Через сколько секунд завершённые задачи удаляются вместе с файлами
+JOBS_RESULT_TTL = int(os.getenv('JOBS_RESULT_TTL', 86400))
+
+JOBS_CLEANUP_INTERVAL = int(os.getenv('JOBS_CLEANUP_INTERVAL', 3600))
+
+# Порт, на котором run_jobs отдаёт метрики своих процессов, 0 выключает
+JOBS_METRICS_PORT = int(os.getenv('JOBS_METRICS_PORT', 0))
+
+JOBS_METRICS_DIR = os.getenv('JOBS_METRICS_DIR', '/tmp/prometheus-jobs')
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'russian')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.User'
 
+TEST_RUNNER = 'foodgram.test_runner.TestRunner'
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSESS': [
         'rest_framework.permissions.AllowAny'
@@ -146,6 +229,67 @@ REST_FRAMEWORK = {
 
 }
 
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', 100))
+
+# exact, estimate (оценка планировщика Postgres) или cached
+PAGINATION_COUNT_STRATEGY = os.getenv('PAGINATION_COUNT_STRATEGY', 'exact')
+
+PAGINATION_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 10000)
+)
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+)
+
+# Предупреждать в лог о запросах сверх бюджетов из api.budgets
+QUERY_BUDGET_WARNINGS = os.getenv('QUERY_BUDGET_WARNINGS', 'False') == 'True'
+
+QUERY_BUDGET_REPORTED_QUERIES = int(
+    os.getenv('QUERY_BUDGET_REPORTED_QUERIES', 10)
+)
+
+# Доля запросов с замером времени, 0 выключает замер
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_TIMING_SAMPLE_RATE', 0.1)
+)
+
+# Server-Timing раскрывает число запросов к базе, включать не в проде
+REQUEST_TIMING_HEADER = os.getenv('REQUEST_TIMING_HEADER', 'False') == 'True'
+
+# Запросы дольше порога попадают в отчёт slow_query_report, 0 выключает
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 500))
+
+SLOW_QUERY_EXPLAIN_INTERVAL = int(
+    os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 600)
+)
+
+SLOW_QUERY_MAX_FINGERPRINTS = int(
+    os.getenv('SLOW_QUERY_MAX_FINGERPRINTS', 500)
+)
+
+SLOW_QUERY_DIR = CACHE_DIR / 'slow_queries'
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.getenv('API_LOG_LEVEL', 'INFO'),
+        },
+        'jobs': {
+            'handlers': ['console'],
+            'level': os.getenv('JOBS_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 DJOSER = {
     'HIDE_USERS': False,
     'PERMISSIONS': {
@@ -0,0 +1,19 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Запускает тесты без выборочного замера запросов.
+
+    RequestTimingMiddleware пишет замеры строками JSON в лог, в выводе
+    тестов они только мешают.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.timing_settings = override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+        self.timing_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.timing_settings.disable()
+        super().teardown_test_environment(**kwargs)
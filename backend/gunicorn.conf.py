@@ -0,0 +1,24 @@
+import os
+import shutil
+
+
+# Метрики воркеров gunicorn пишутся в общий каталог и собираются
+# в /metrics. Переменная задаётся только здесь, чтобы её не получили
+# другие процессы образа: run_jobs пишет метрики в свой каталог
+# JOBS_METRICS_DIR и отдаёт их на порту JOBS_METRICS_PORT.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def on_starting(server):
+    """Очищает метрики прошлого запуска перед стартом воркеров."""
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'user', 'status', 'created', 'finished')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created', 'started', 'finished', 'attempts')
+    list_per_page = 25
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from prometheus_client import (
+    CollectorRegistry,
+    multiprocess,
+    start_http_server,
+)
+
+from jobs.models import Job
+from jobs.runner import execute_job, setup_worker
+
+
+class Command(BaseCommand):
+    """Менеджмент команда для запуска воркеров фоновых задач."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.JOBS_PROCESSES or os.cpu_count(),
+            help='Количество процессов в пуле.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Завершиться, когда очередь опустеет.',
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            default=settings.JOBS_METRICS_PORT,
+            help='Порт для метрик Prometheus, 0 выключает.',
+        )
+
+    def serve_metrics(self, port):
+        """Отдаёт метрики процессов пула на порту port.
+
+        Процессы пула наследуют PROMETHEUS_MULTIPROC_DIR и пишут
+        значения в файлы, здесь они собираются вместе.
+        """
+        directory = str(settings.JOBS_METRICS_DIR)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = directory
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=directory)
+        start_http_server(port, registry=registry)
+        self.stdout.write(f'Serving metrics on port {port}')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        processes = options['processes']
+        poll_interval = settings.JOBS_POLL_INTERVAL
+        next_cleanup = time.monotonic()
+        if options['metrics_port']:
+            self.serve_metrics(options['metrics_port'])
+        self.stdout.write(f'Starting {processes} job workers')
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=setup_worker,
+        ) as pool:
+            running = set()
+            while True:
+                if time.monotonic() >= next_cleanup:
+                    next_cleanup = (
+                        time.monotonic() + settings.JOBS_CLEANUP_INTERVAL
+                    )
+                    deleted = Job.objects.delete_expired()
+                    if deleted:
+                        self.stdout.write(f'Deleted {deleted} expired jobs')
+                free = processes - len(running)
+                if free:
+                    for job_id in Job.objects.claim(limit=free):
+                        running.add(pool.submit(execute_job, job_id))
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                done, running = wait(
+                    running, timeout=poll_interval, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    try:
+                        job_id, status = future.result()
+                    except Exception as error:
+                        self.stderr.write(f'Job worker crashed: {error!r}')
+                        continue
+                    self.stdout.write(f'Job {job_id}: {status}')
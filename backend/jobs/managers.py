@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class JobQuerySet(models.QuerySet):
+    def claim(self, limit):
+        """Забирает до limit задач в работу и возвращает их id.
+
+        Задачи, которые слишком долго числятся выполняющимися
+        (воркер упал), берутся повторно.
+        """
+        now = timezone.now()
+        stale = now - timedelta(seconds=settings.JOBS_STALE_TIMEOUT)
+        stale_running = Q(status=self.model.Status.RUNNING, started__lt=stale)
+        queryset = self.filter(
+            Q(status=self.model.Status.PENDING)
+            | stale_running & Q(attempts__lt=settings.JOBS_MAX_ATTEMPTS)
+        ).order_by('created')
+        with transaction.atomic(using=self.db):
+            self.filter(
+                stale_running, attempts__gte=settings.JOBS_MAX_ATTEMPTS
+            ).update(
+                status=self.model.Status.FAILED,
+                error='Воркер не завершил задачу.',
+                finished=now,
+            )
+            if connections[self.db].features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            job_ids = list(queryset.values_list('id', flat=True)[:limit])
+            self.filter(id__in=job_ids).update(
+                status=self.model.Status.RUNNING,
+                started=now,
+                attempts=F('attempts') + 1,
+            )
+        return job_ids
+
+    def delete_expired(self):
+        """Удаляет завершённые раньше JOBS_RESULT_TTL задачи и их файлы."""
+        expired = list(
+            self.filter(
+                status__in=(self.model.Status.DONE, self.model.Status.FAILED),
+                finished__lt=timezone.now()
+                - timedelta(seconds=settings.JOBS_RESULT_TTL),
+            ).only('id', 'result')
+        )
+        for job in expired:
+            if job.result:
+                job.result.delete(save=False)
+        return self.filter(id__in=[job.pk for job in expired]).delete()[0]
+
+
+class JobManager(models.Manager):
+    def get_queryset(self):
+        return JobQuerySet(self.model, using=self._db)
+
+    def claim(self, limit):
+        return self.get_queryset().claim(limit=limit)
+
+    def delete_expired(self):
+        return self.get_queryset().delete_expired()
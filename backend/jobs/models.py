@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from jobs.managers import JobManager
+
+
+User = get_user_model()
+
+
+class Job(models.Model):
+    """Модель для фоновых задач."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        null=True,
+        blank=True,
+        help_text='Пусто у служебных задач',
+    )
+    kind = models.CharField(max_length=50, help_text='Тип задачи')
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    result = models.FileField(upload_to='jobs/', blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    objects = JobManager()
+
+    def __str__(self) -> str:
+        return f'{self.kind} #{self.pk} ({self.status})'
+
+    class Meta:
+        ordering = ('-created',)
@@ -0,0 +1,61 @@
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+JOB_ERROR_MESSAGE = 'Не удалось выполнить задачу.'
+
+
+def setup_worker():
+    """Инициализация процесса пула.
+
+    Модуль загружается в новом процессе до django.setup(),
+    поэтому модели импортируются внутри функций.
+    """
+    import django
+
+    django.setup()
+
+
+def execute_job(job_id):
+    """Выполняет задачу в процессе пула.
+
+    Обработчик задачи берётся из settings.JOB_HANDLERS по её типу
+    и возвращает пару (расширение файла, содержимое) или None, если
+    задача не создаёт файл. Трейсбек ошибки
+    пишется в лог, в задаче остаётся только общее сообщение.
+    """
+    from jobs.models import Job
+
+    job = Job.objects.get(pk=job_id)
+    try:
+        handler = import_string(settings.JOB_HANDLERS[job.kind])
+        result = handler(job)
+        if result is not None:
+            extension, content = result
+            job.result.save(
+                f'{job.kind}_{uuid.uuid4().hex}.{extension}',
+                ContentFile(content),
+                save=False,
+            )
+        job.status = Job.Status.DONE
+        job.error = ''
+    except Exception:
+        logger.exception('Задача %s (%s) упала', job.pk, job.kind)
+        job.error = JOB_ERROR_MESSAGE
+        job.status = (
+            Job.Status.FAILED
+            if job.attempts >= settings.JOBS_MAX_ATTEMPTS
+            else Job.Status.PENDING
+        )
+    job.finished = timezone.now()
+    job.save(update_fields=('result', 'status', 'error', 'finished'))
+    connections.close_all()
+    return job_id, job.status
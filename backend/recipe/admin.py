@@ -6,6 +6,7 @@ from recipe.models import (
     Recipe,
     RecipeFavourite,
     RecipeIngredient,
+    ShopListIngredient,
     Tag,
 )
 
@@ -60,6 +61,25 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_select_related = ('author',)
 
+    def save_related(self, request, form, formsets, change):
+        """Пересчитывает списки покупок, если поменялись ингредиенты.
+
+        Пересчёт идёт и для тех, у кого рецепт убрали из корзины в этой
+        же форме: их строки вычитались уже с новыми ингредиентами.
+        """
+        ingredients_changed = any(
+            formset.has_changed()
+            for formset in formsets
+            if formset.model is RecipeIngredient
+        )
+        if not ingredients_changed:
+            return super().save_related(request, form, formsets, change)
+        cart = ReciepeShopList.objects.filter(recipe=form.instance)
+        user_ids = set(cart.values_list('user_id', flat=True))
+        super().save_related(request, form, formsets, change)
+        user_ids.update(cart.values_list('user_id', flat=True))
+        ShopListIngredient.objects.rebuild(user_ids=user_ids)
+
     def num_of_favourites(self, obj):
         result = obj.favourites.all()
         counter = 0
@@ -0,0 +1,235 @@
+import random
+from bisect import bisect_right
+from dataclasses import dataclass
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+
+CHUNK_SIZE = 1000
+
+WORDS = (
+    'борщ', 'суп', 'салат', 'пирог', 'каша', 'рагу', 'плов', 'омлет',
+    'запеканка', 'блины', 'котлеты', 'паста', 'ризотто', 'жаркое',
+    'быстрый', 'домашний', 'острый', 'сытный', 'лёгкий', 'праздничный',
+    'овощной', 'куриный', 'рыбный', 'грибной', 'сырный', 'сладкий',
+)
+
+PLACEHOLDER_IMAGE = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S0e'
+    'cCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5E'
+    'rkJggg=='
+)
+
+_plan = None
+
+
+@dataclass
+class Plan:
+    """Параметры генерации, общие для всех процессов.
+
+    Количество рецептов каждого пользователя выбирается заранее,
+    поэтому каждая пачка знает свой диапазон id и процессам не
+    нужно договариваться между собой.
+    """
+
+    seed: int
+    users: int
+    user_start: int
+    recipe_start: int
+    recipe_offsets: list
+    tag_ids: list
+    ingredient_ids: list
+    ingredients_per_recipe: tuple
+    favorites_per_user: int
+    carts_per_user: int
+    follows_per_user: int
+    popularity_skew: float
+    password: str
+    images: dict
+    batch_size: int
+
+    @property
+    def recipes(self):
+        return self.recipe_offsets[-1]
+
+    @property
+    def chunks(self):
+        return range((self.users + CHUNK_SIZE - 1) // CHUNK_SIZE)
+
+    def chunk_users(self, chunk):
+        return range(
+            chunk * CHUNK_SIZE, min(self.users, (chunk + 1) * CHUNK_SIZE)
+        )
+
+    def rng(self, phase, chunk):
+        return random.Random(f'{self.seed}:{phase}:{chunk}')
+
+    def popular_recipe(self, rng):
+        """Номер рецепта, ранние рецепты популярнее поздних."""
+        return int(self.recipes * rng.random() ** self.popularity_skew)
+
+    def author_of(self, recipe_index):
+        return bisect_right(self.recipe_offsets, recipe_index) - 1
+
+
+def recipes_per_user(rng, mean, alpha, limit):
+    """Степенное распределение со средним mean и хвостом alpha."""
+    return min(
+        limit, int((rng.paretovariate(alpha) - 1) * mean * (alpha - 1))
+    )
+
+
+def use_plan(plan):
+    global _plan
+    _plan = plan
+
+
+def setup_worker(plan):
+    """Инициализация процесса пула, модели импортируются в функциях."""
+    import django
+
+    django.setup()
+    use_plan(plan)
+
+
+def save_images(plan, recipe_id):
+    """Копия картинки-заглушки и её вариантов для рецепта.
+
+    Возвращает имя картинки и словарь для Recipe.image_variants.
+    """
+    names = {
+        variant: default_storage.save(
+            name.format(recipe_id), ContentFile(content)
+        )
+        for variant, (name, content) in plan.images.items()
+    }
+    return names['source'], names
+
+
+def bulk_insert(model, objects, batch_size):
+    with transaction.atomic():
+        model.objects.bulk_create(
+            objects, batch_size=batch_size, ignore_conflicts=True
+        )
+
+
+def generate_users(chunk):
+    from user.models import User
+
+    plan = _plan
+    users = [
+        User(
+            id=plan.user_start + index,
+            username=f'user{plan.user_start + index}',
+            email=f'user{plan.user_start + index}@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password=plan.password,
+        )
+        for index in plan.chunk_users(chunk)
+    ]
+    bulk_insert(User, users, plan.batch_size)
+    connections.close_all()
+    return len(users)
+
+
+def generate_recipes(chunk):
+    from recipe.models import Recipe, RecipeIngredient
+
+    plan = _plan
+    rng = plan.rng('recipes', chunk)
+    recipes = []
+    recipe_ingredients = []
+    recipe_tags = []
+    for user_index in plan.chunk_users(chunk):
+        for recipe_index in range(
+            plan.recipe_offsets[user_index],
+            plan.recipe_offsets[user_index + 1],
+        ):
+            recipe_id = plan.recipe_start + recipe_index
+            image, image_variants = save_images(plan, recipe_id)
+            recipes.append(
+                Recipe(
+                    id=recipe_id,
+                    author_id=plan.user_start + user_index,
+                    name=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                    text=' '.join(rng.choices(WORDS, k=30)),
+                    cooking_time=rng.randint(5, 180),
+                    image=image,
+                    image_variants=image_variants,
+                )
+            )
+            for ingredient_id in rng.sample(
+                plan.ingredient_ids,
+                min(
+                    len(plan.ingredient_ids),
+                    rng.randint(*plan.ingredients_per_recipe),
+                ),
+            ):
+                recipe_ingredients.append(
+                    RecipeIngredient(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=rng.randint(1, 500),
+                    )
+                )
+            for tag_id in rng.sample(
+                plan.tag_ids, rng.randint(1, len(plan.tag_ids))
+            ):
+                recipe_tags.append(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                )
+    bulk_insert(Recipe, recipes, plan.batch_size)
+    bulk_insert(RecipeIngredient, recipe_ingredients, plan.batch_size)
+    bulk_insert(Recipe.tags.through, recipe_tags, plan.batch_size)
+    connections.close_all()
+    return len(recipes) + len(recipe_ingredients) + len(recipe_tags)
+
+
+def generate_relations(chunk):
+    from recipe.models import ReciepeShopList, RecipeFavourite
+    from user.models import UserFollowing
+
+    plan = _plan
+    rng = plan.rng('relations', chunk)
+    favorites = []
+    carts = []
+    follows = []
+    for user_index in plan.chunk_users(chunk):
+        user_id = plan.user_start + user_index
+        if plan.recipes:
+            for model, objects, mean in (
+                (RecipeFavourite, favorites, plan.favorites_per_user),
+                (ReciepeShopList, carts, plan.carts_per_user),
+            ):
+                recipe_indexes = {
+                    plan.popular_recipe(rng)
+                    for _ in range(rng.randint(0, 2 * mean))
+                }
+                objects.extend(
+                    model(
+                        user_id=user_id,
+                        recipe_id=plan.recipe_start + recipe_index,
+                    )
+                    for recipe_index in recipe_indexes
+                )
+        author_indexes = {
+            plan.author_of(plan.popular_recipe(rng)) if plan.recipes
+            else rng.randrange(plan.users)
+            for _ in range(rng.randint(0, 2 * plan.follows_per_user))
+        }
+        author_indexes.discard(user_index)
+        follows.extend(
+            UserFollowing(
+                user_id=plan.user_start + author_index,
+                following_user_id=user_id,
+            )
+            for author_index in author_indexes
+        )
+    bulk_insert(RecipeFavourite, favorites, plan.batch_size)
+    bulk_insert(ReciepeShopList, carts, plan.batch_size)
+    bulk_insert(UserFollowing, follows, plan.batch_size)
+    connections.close_all()
+    return len(favorites) + len(carts) + len(follows)
@@ -0,0 +1,86 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def variant_name(name, variant, image_format):
+    """Имя файла варианта рядом с оригиналом."""
+    path = PurePosixPath(name)
+    return str(
+        path.with_name(f'{path.stem}_{variant}.{EXTENSIONS[image_format]}')
+    )
+
+
+def render_variant(image, size, image_format):
+    """Уменьшает картинку, чтобы она вписалась в size, и кодирует её."""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    elif variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA')
+    buffer = BytesIO()
+    variant.save(
+        buffer,
+        format=image_format,
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def generate_variants(recipe):
+    """Создаёт уменьшенные копии картинки рецепта.
+
+    Возвращает словарь вариантов для Recipe.image_variants: имя
+    оригинала под ключом source и имена файлов вариантов.
+    Варианты предыдущей картинки удаляются. JPEG декодируется сразу
+    в уменьшенном масштабе, чтобы не держать в памяти оригинал.
+    """
+    storage = recipe.image.storage
+    largest = max(
+        max(width, height)
+        for width, height, _ in settings.RECIPE_IMAGE_VARIANTS.values()
+    )
+    with recipe.image.open('rb') as file:
+        image = Image.open(file)
+        image.draft(None, (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    variants = {'source': recipe.image.name}
+    for variant, (width, height, image_format) in (
+        settings.RECIPE_IMAGE_VARIANTS.items()
+    ):
+        name = variant_name(recipe.image.name, variant, image_format)
+        if storage.exists(name):
+            storage.delete(name)
+        variants[variant] = storage.save(
+            name,
+            ContentFile(render_variant(image, (width, height), image_format)),
+        )
+    for variant, name in recipe.image_variants.items():
+        if variant != 'source' and name not in variants.values():
+            storage.delete(name)
+    return variants
+
+
+def delete_variants(storage, variants):
+    """Удаляет файлы вариантов, оригинал остаётся."""
+    for variant, name in variants.items():
+        if variant != 'source':
+            storage.delete(name)
+
+
+def variants_outdated(recipe):
+    """Нужно ли заново создавать варианты картинки рецепта."""
+    if not recipe.image:
+        return False
+    return recipe.image_variants.get('source') != recipe.image.name or bool(
+        settings.RECIPE_IMAGE_VARIANTS.keys() - recipe.image_variants.keys()
+    )
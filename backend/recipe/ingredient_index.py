@@ -0,0 +1,246 @@
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count
+
+from recipe.models import Ingredient
+
+
+MAGIC = b'FGII'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIII')
+
+
+class _Keys:
+    """Ленивая последовательность ключей для bisect."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(
+            self.blob[self.offsets[index]:self.offsets[index + 1] - 1]
+        )
+
+
+class _IndexFile:
+    """Отображённый в память файл индекса.
+
+    Формат: заголовок, массивы id, популярности и смещений,
+    затем ключи (имена в нижнем регистре через перевод строки),
+    имена и единицы измерения.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.signature = (stat.st_ino, stat.st_mtime_ns)
+        magic, version, count, keys_len, names_len, units_len = (
+            HEADER.unpack_from(self.mm)
+        )
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise OSError('Неверный формат индекса ингредиентов.')
+        view = memoryview(self.mm)
+        position = HEADER.size
+        sections = []
+        for typecode, length in (
+            ('q', count),
+            ('I', count),
+            ('I', count + 1),
+            ('I', count + 1),
+            ('I', count + 1),
+        ):
+            size = struct.calcsize(typecode) * length
+            sections.append(view[position:position + size].cast(typecode))
+            position += size
+        self.ids, self.ranks, key_offsets, name_offsets, unit_offsets = (
+            sections
+        )
+        self.keys_start = position
+        self.keys_end = position + keys_len
+        self.keys = _Keys(view[self.keys_start:self.keys_end], key_offsets)
+        names = view[self.keys_end:self.keys_end + names_len]
+        units = view[
+            self.keys_end + names_len:self.keys_end + names_len + units_len
+        ]
+        self.names = _Keys(names, name_offsets)
+        self.units = _Keys(units, unit_offsets)
+        self.count = count
+
+    def item(self, index):
+        return {
+            'id': self.ids[index],
+            'name': self.names[index].decode(),
+            'measurement_unit': self.units[index].decode(),
+        }
+
+    def prefix_matches(self, prefix):
+        start = bisect_left(self.keys, prefix)
+        end = start
+        while end < self.count and self.keys[end].startswith(prefix):
+            end += 1
+        return range(start, end)
+
+    def substring_matches(self, query):
+        offsets = self.keys.offsets
+        position = self.keys_start
+        while True:
+            position = self.mm.find(query, position, self.keys_end)
+            if position == -1:
+                return
+            index = bisect_right(offsets, position - self.keys_start) - 1
+            yield index
+            position = self.keys_start + offsets[index + 1]
+
+
+class IngredientIndex:
+    """Индекс для автодополнения ингредиентов.
+
+    Хранится в файле, который отображается в память каждым воркером,
+    поэтому страницы файла разделяются между процессами. Файл
+    пересобирается, если он старше отметки invalidate или старше
+    INGREDIENT_INDEX_MAX_AGE секунд. Пересобирает один процесс под
+    файловой блокировкой, остальные тем временем читают старый файл.
+    """
+
+    def __init__(self):
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return Path(settings.INGREDIENT_INDEX_PATH)
+
+    @property
+    def stale_path(self):
+        return self.path.with_suffix('.stale')
+
+    @property
+    def lock_path(self):
+        return self.path.with_suffix('.lock')
+
+    def build(self):
+        # Время файла — начало сборки: отметка invalidate, сделанная
+        # во время чтения базы, оставит новый файл устаревшим.
+        started = time.time_ns()
+        rows = sorted(
+            (name.lower().encode(), pk, rank, name.encode(), unit.encode())
+            for pk, name, unit, rank in Ingredient.objects.annotate(
+                rank=Count('ingredients_with_amount')
+            ).values_list('id', 'name', 'measurement_unit', 'rank')
+        )
+        ids, ranks = array('q'), array('I')
+        blobs = ([], [], [])
+        offsets = (array('I', [0]), array('I', [0]), array('I', [0]))
+        for key, pk, rank, name, unit in rows:
+            ids.append(pk)
+            ranks.append(rank)
+            for blob, offset, value in zip(blobs, offsets, (key, name, unit)):
+                blob.append(value + b'\n')
+                offset.append(offset[-1] + len(value) + 1)
+        keys, names, units = (b''.join(blob) for blob in blobs)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.path.parent)
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(
+                HEADER.pack(
+                    MAGIC, VERSION, len(rows),
+                    len(keys), len(names), len(units),
+                )
+            )
+            for section in (ids, ranks, *offsets):
+                section.tofile(file)
+            file.write(keys + names + units)
+        os.utime(temp_path, ns=(started, started))
+        os.replace(temp_path, self.path)
+
+    def invalidate(self):
+        """Помечает индекс устаревшим, не удаляя файл."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stale_path.touch()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def _is_stale(self, stat):
+        if time.time() - stat.st_mtime > settings.INGREDIENT_INDEX_MAX_AGE:
+            return True
+        try:
+            return os.stat(self.stale_path).st_mtime_ns >= stat.st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _rebuild(self, wait):
+        """Пересобирает индекс, если он всё ещё нужен.
+
+        Без wait сразу выходит, когда индекс уже собирает другой процесс.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        operation = fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB
+        with open(self.lock_path, 'w') as lock:
+            try:
+                fcntl.flock(lock, operation)
+            except BlockingIOError:
+                return
+            stat = self._stat()
+            if stat is None or self._is_stale(stat):
+                self.build()
+
+    def _get_file(self):
+        with self._lock:
+            stat = self._stat()
+            if stat is None or self._is_stale(stat):
+                self._rebuild(wait=stat is None)
+                stat = self._stat()
+            if self._file is None or self._file.signature != (
+                stat.st_ino, stat.st_mtime_ns
+            ):
+                self._file = _IndexFile(self.path)
+            return self._file
+
+    def all(self):
+        index_file = self._get_file()
+        return [index_file.item(index) for index in range(index_file.count)]
+
+    def search(self, query):
+        """Поиск по началу названия, затем по подстроке.
+
+        Внутри каждой группы результаты упорядочены по тому,
+        как часто ингредиент встречается в рецептах.
+        """
+        index_file = self._get_file()
+        query = query.lower().encode()
+        if not query:
+            return self.all()
+        prefix = index_file.prefix_matches(query)
+        substring = set(index_file.substring_matches(query)).difference(
+            prefix
+        )
+        prefix, substring = (
+            sorted(
+                indexes, key=lambda index: (-index_file.ranks[index], index)
+            )
+            for indexes in (prefix, substring)
+        )
+        return [index_file.item(index) for index in prefix + substring]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,21 @@
+from recipe.images import delete_variants, generate_variants, variants_outdated
+from recipe.models import Recipe
+
+
+def generate_image_variants(job):
+    """Фоновая задача: уменьшенные копии картинки рецепта.
+
+    Если картинку успели заменить, созданные варианты удаляются:
+    для новой картинки поставлена своя задача.
+    """
+    recipe = Recipe.objects.filter(pk=job.params['recipe_id']).only(
+        'id', 'image', 'image_variants'
+    ).first()
+    if recipe is None or not variants_outdated(recipe):
+        return None
+    variants = generate_variants(recipe)
+    if not Recipe.objects.filter(
+        pk=recipe.pk, image=recipe.image.name
+    ).update(image_variants=variants):
+        delete_variants(recipe.image.storage, variants)
+    return None
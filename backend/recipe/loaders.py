@@ -0,0 +1,71 @@
+import csv
+import json
+from itertools import islice
+
+
+JSON_CHUNK_SIZE = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """Отдаёт объекты из JSON-массива, не читая файл целиком.
+
+    В памяти держится только текущий кусок файла и разбираемый
+    элемент.
+    """
+    buffer = file.read(chunk_size)
+    position = 0
+    started = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position == len(buffer):
+            buffer, position = file.read(chunk_size), 0
+            if not buffer:
+                raise ValueError('Неожиданный конец JSON-массива.')
+            continue
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError('Ожидается JSON-массив.')
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            item, position = _decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+
+
+def iter_csv(file, fieldnames):
+    """Строки CSV в виде словарей.
+
+    Если в первой строке только имена из fieldnames, она считается
+    заголовком, иначе колонки идут в порядке fieldnames.
+    """
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    if set(header) <= set(fieldnames):
+        fieldnames = header
+    else:
+        yield dict(zip(fieldnames, header))
+    for row in reader:
+        yield dict(zip(fieldnames, row))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import random
+import time
+from base64 import b64decode
+from io import BytesIO
+from itertools import accumulate
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from PIL import Image
+
+from recipe import fake_data
+from recipe.images import render_variant, variant_name
+from recipe.ingredient_index import ingredient_index
+from recipe.loaders import batched
+from recipe.models import Ingredient, Recipe, ShopListIngredient, Tag
+from recipe.versions import ingredients_version, tags_version
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Менеджмент команда для генерации синтетических данных.
+
+    Одинаковый --seed даёт одинаковые данные при любом числе
+    процессов. Пользователи делятся на пачки по fake_data.CHUNK_SIZE,
+    пачки пишутся параллельно через bulk_create.
+    """
+
+    help = 'Генерирует пользователей, рецепты и связи для нагрузочных тестов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--recipes-per-user',
+            type=float,
+            default=5,
+            help='Среднее число рецептов на пользователя.',
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.5,
+            help='Показатель степенного распределения рецептов (> 1).',
+        )
+        parser.add_argument('--max-recipes-per-user', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, nargs=2, default=(3, 12)
+        )
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--favorites-per-user', type=int, default=10)
+        parser.add_argument('--carts-per-user', type=int, default=3)
+        parser.add_argument('--follows-per-user', type=int, default=5)
+        parser.add_argument(
+            '--popularity-skew',
+            type=float,
+            default=2.0,
+            help='Насколько избранное и подписки смещены к популярным.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['alpha'] <= 1:
+            raise CommandError('--alpha должен быть больше 1.')
+        processes = options['processes']
+        if connection.vendor == 'sqlite' and processes > 1:
+            self.stdout.write('SQLite не умеет писать параллельно, 1 процесс')
+            processes = 1
+        plan = self.make_plan(options)
+        self.stdout.write(
+            f'Пользователей: {plan.users}, рецептов: {plan.recipes}'
+        )
+        if processes > 1:
+            connection.close()
+            with multiprocessing.get_context('spawn').Pool(
+                processes,
+                initializer=fake_data.setup_worker,
+                initargs=(plan,),
+            ) as pool:
+                self.run_phases(plan, pool.imap_unordered)
+        else:
+            fake_data.use_plan(plan)
+            self.run_phases(plan, map)
+        self.after_generate(plan, options['batch_size'])
+
+    def make_plan(self, options):
+        rng = random.Random(options['seed'])
+        tag_ids = self.ensure_catalog(
+            Tag, options['tags'], lambda number: Tag(
+                name=f'Тег {number}',
+                color=f'#{number:06X}',
+                slug=f'tag-{number}',
+            )
+        )
+        ingredient_ids = self.ensure_catalog(
+            Ingredient, options['ingredients'], lambda number: Ingredient(
+                name=f'ингредиент {number}', measurement_unit='г'
+            )
+        )
+        counts = [
+            fake_data.recipes_per_user(
+                rng,
+                options['recipes_per_user'],
+                options['alpha'],
+                options['max_recipes_per_user'],
+            )
+            for _ in range(options['users'])
+        ]
+        return fake_data.Plan(
+            seed=options['seed'],
+            users=options['users'],
+            user_start=(
+                User.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+            ) + 1,
+            recipe_start=(
+                Recipe.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+            ) + 1,
+            recipe_offsets=list(accumulate(counts, initial=0)),
+            tag_ids=tag_ids,
+            ingredient_ids=ingredient_ids,
+            ingredients_per_recipe=tuple(options['ingredients_per_recipe']),
+            favorites_per_user=options['favorites_per_user'],
+            carts_per_user=options['carts_per_user'],
+            follows_per_user=options['follows_per_user'],
+            popularity_skew=options['popularity_skew'],
+            password=make_password('password'),
+            images=self.placeholder_images(),
+            batch_size=options['batch_size'],
+        )
+
+    def ensure_catalog(self, model, count, build):
+        """Досоздаёт теги или ингредиенты до нужного количества."""
+        existing = model.objects.count()
+        model.objects.bulk_create(
+            (build(number) for number in range(existing, count)),
+            ignore_conflicts=True,
+        )
+        return list(
+            model.objects.order_by('id').values_list('id', flat=True)[:count]
+        )
+
+    def placeholder_images(self):
+        """Картинка-заглушка и её варианты: {вариант: (шаблон имени, байты)}.
+
+        Варианты кодируются один раз, каждый рецепт получает свои копии
+        файлов, как рецепты, созданные через API.
+        """
+        content = b64decode(fake_data.PLACEHOLDER_IMAGE)
+        name = 'recipes/images/fake_{}.png'
+        image = Image.open(BytesIO(content))
+        image.load()
+        images = {'source': (name, content)}
+        for variant, (width, height, image_format) in (
+            settings.RECIPE_IMAGE_VARIANTS.items()
+        ):
+            images[variant] = (
+                variant_name(name, variant, image_format),
+                render_variant(image, (width, height), image_format),
+            )
+        return images
+
+    def run_phases(self, plan, map_chunks):
+        for phase in (
+            fake_data.generate_users,
+            fake_data.generate_recipes,
+            fake_data.generate_relations,
+        ):
+            started = time.monotonic()
+            rows = sum(map_chunks(phase, plan.chunks))
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{phase.__name__}: {rows} строк за {elapsed:.2f} с '
+                f'({rows / elapsed if elapsed else rows:.0f} строк/с)'
+            )
+
+    def after_generate(self, plan, batch_size):
+        """Пересчитывает то, что обычно поддерживают сигналы."""
+        started = time.monotonic()
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Recipe]
+            ):
+                cursor.execute(sql)
+        user_ids = range(plan.user_start, plan.user_start + plan.users)
+        for chunk in batched(user_ids, batch_size):
+            with transaction.atomic():
+                ShopListIngredient.objects.rebuild(user_ids=chunk)
+        recipe_ids = range(
+            plan.recipe_start, plan.recipe_start + plan.recipes
+        )
+        for chunk in batched(recipe_ids, batch_size):
+            Recipe.with_params.filter(pk__in=chunk).update_search_index()
+        ingredient_index.invalidate()
+        ingredients_version.bump()
+        tags_version.bump()
+        self.stdout.write(
+            f'Списки покупок и поиск: {time.monotonic() - started:.2f} с'
+        )
@@ -0,0 +1,40 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from recipe.images import generate_variants, variants_outdated
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    """Менеджмент команда для создания уменьшенных копий картинок."""
+
+    help = 'Создаёт недостающие уменьшенные копии картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты для всех рецептов.',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        generated = failed = 0
+        for recipe in Recipe.objects.only(
+            'id', 'image', 'image_variants'
+        ).iterator():
+            if not recipe.image or (
+                not options['force'] and not variants_outdated(recipe)
+            ):
+                continue
+            try:
+                recipe.image_variants = generate_variants(recipe)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'Recipe {recipe.pk}: {error}')
+                continue
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_variants=recipe.image_variants
+            )
+            generated += 1
+        self.stdout.write(f'Generated: {generated}, failed: {failed}')
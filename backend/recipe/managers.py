@@ -1,37 +1,200 @@
 from django.apps import apps
-from django.db import models
-from django.db.models import Exists, OuterRef, Prefetch, Sum, Value
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
 
 
-class RecipeShopListQuerySet(models.QuerySet):
+RECIPE_FTS_TABLE = 'recipe_recipe_fts'
+
+
+def fts5_query(query):
+    """Превращает пользовательский ввод в безопасный запрос FTS5."""
+    return ' '.join(
+        '"{}"*'.format(token.replace('"', '""')) for token in query.split()
+    )
+
+
+def remove_from_search_index(pks, using):
+    """Удаляет рецепты из FTS-таблицы SQLite.
+
+    В Postgres индекс хранится в самой таблице рецептов и удаляется
+    вместе со строкой.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {RECIPE_FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in pks],
+        )
+
+
+class ShopListIngredientQuerySet(models.QuerySet):
     def all_ingredients(self, user):
-        return self.filter(user=user).values_list(
-            'recipe_id__ingredients__name',
-            'recipe_id__ingredients__measurement_unit',
-            Sum('recipe_id__ingredients__ingredients_with_amount__amount'),
+        return self.filter(user=user, recipes_count__gt=0).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        )
+
+    @transaction.atomic
+    def apply_changes(self, user_ids, changes):
+        """Применяет изменения к спискам покупок пользователей.
+
+        changes: {ingredient_id: (изменение количества,
+        изменение числа рецептов с этим ингредиентом)}.
+
+        Недостающие строки вставляются пустыми с ignore_conflicts, затем
+        один UPDATE прибавляет изменения к текущим значениям. Поэтому
+        параллельные изменения одного списка складываются, а не падают
+        на уникальном ключе и не перезаписывают друг друга. Строки,
+        в которых не осталось рецептов, не удаляются: удаление гонялось
+        бы с параллельным добавлением, а all_ingredients их пропускает.
+        Количество в таких строках тем же UPDATE обнуляется, чтобы
+        не копилась ошибка округления.
+        """
+        user_ids = list(user_ids)
+        changes = {
+            ingredient_id: change
+            for ingredient_id, change in changes.items()
+            if change != (0, 0)
+        }
+        if not user_ids or not changes:
+            return
+        added = [
+            ingredient_id
+            for ingredient_id, (_, recipes) in changes.items()
+            if recipes > 0
+        ]
+        if added:
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, ingredient_id=ingredient_id)
+                    for user_id in user_ids
+                    for ingredient_id in added
+                ],
+                ignore_conflicts=True,
+            )
+        self.filter(user_id__in=user_ids, ingredient_id__in=changes).update(
+            amount=Case(
+                *(
+                    When(
+                        ingredient_id=ingredient_id,
+                        recipes_count__lte=-recipes,
+                        then=Value(0.0),
+                    )
+                    for ingredient_id, (_, recipes) in changes.items()
+                    if recipes < 0
+                ),
+                default=F('amount') + Case(
+                    *(
+                        When(ingredient_id=ingredient_id, then=Value(amount))
+                        for ingredient_id, (amount, _) in changes.items()
+                    ),
+                    default=Value(0),
+                    output_field=FloatField(),
+                ),
+                output_field=FloatField(),
+            ),
+            recipes_count=F('recipes_count') + Case(
+                *(
+                    When(ingredient_id=ingredient_id, then=Value(recipes))
+                    for ingredient_id, (_, recipes) in changes.items()
+                ),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+
+    def add_recipe(self, user_ids, recipe, sign=1):
+        self.apply_changes(
+            user_ids=user_ids,
+            changes={
+                ingredient_id: (sign * amount, sign)
+                for ingredient_id, amount in apps.get_model(
+                    app_label='recipe', model_name='RecipeIngredient'
+                ).objects.filter(recipe=recipe).values_list(
+                    'ingredient_id', 'amount'
+                )
+            },
+        )
+
+    def remove_recipe(self, user_ids, recipe):
+        self.add_recipe(user_ids=user_ids, recipe=recipe, sign=-1)
+
+    @transaction.atomic
+    def rebuild(self, user_ids):
+        """Пересчитывает списки покупок пользователей с нуля.
+
+        Нужен после изменения ингредиентов рецепта в обход
+        CreateRecipeSerializer, например в админке.
+        """
+        user_ids = list(user_ids)
+        self.filter(user_id__in=user_ids).delete()
+        self.bulk_create(
+            self.model(**row)
+            for row in apps.get_model(
+                app_label='recipe', model_name='ReciepeShopList'
+            ).objects.filter(
+                user_id__in=user_ids,
+                recipe__ingredients_with_amount__isnull=False,
+            ).values(
+                'user_id',
+                ingredient_id=F(
+                    'recipe__ingredients_with_amount__ingredient_id'
+                ),
+            ).annotate(
+                amount=Sum('recipe__ingredients_with_amount__amount'),
+                recipes_count=Count('recipe_id'),
+            ).order_by()
         )
 
 
-class RecipeShopListManager(models.Manager):
+class ShopListIngredientManager(models.Manager):
     def get_queryset(self):
-        return RecipeShopListQuerySet(self.model, using=self._db)
+        return ShopListIngredientQuerySet(self.model, using=self._db)
 
     def all_ingredients(self, user):
         return self.get_queryset().all_ingredients(user=user)
 
+    def apply_changes(self, user_ids, changes):
+        return self.get_queryset().apply_changes(
+            user_ids=user_ids, changes=changes
+        )
+
+    def add_recipe(self, user_ids, recipe):
+        return self.get_queryset().add_recipe(
+            user_ids=user_ids, recipe=recipe
+        )
+
+    def remove_recipe(self, user_ids, recipe):
+        return self.get_queryset().remove_recipe(
+            user_ids=user_ids, recipe=recipe
+        )
+
+    def rebuild(self, user_ids):
+        return self.get_queryset().rebuild(user_ids=user_ids)
+
 
 class RecipeQuerySet(models.QuerySet):
     def with_shopcart_and_favorite(self, user):
-        queryset = self.prefetch_related(
-            Prefetch(
-                'ingredients',
-                queryset=apps.get_model(
-                    app_label='recipe', model_name='RecipeIngredient'
-                ).objects.select_related('ingredient'),
-            ),
-            'tags',
-        ).select_related('author')
-
         if user.is_authenticated:
             recipe_favourite = apps.get_model(
                 app_label='recipe', model_name='RecipeFavourite'
@@ -39,14 +202,98 @@ class RecipeQuerySet(models.QuerySet):
             recipe_shop_list = apps.get_model(
                 app_label='recipe', model_name='ReciepeShopList'
             ).objects.filter(user=user, recipe=OuterRef('pk'))
-            return queryset.annotate(
+            return self.annotate(
                 is_favorited=Exists(recipe_favourite),
                 is_in_shopping_cart=Exists(recipe_shop_list),
             )
-        return queryset.annotate(
+        return self.annotate(
             is_favorited=Value(False), is_in_shopping_cart=Value(False)
         )
 
+    def first_per_author(self, author_ids, limit):
+        """Первые limit рецептов каждого из авторов одним запросом."""
+        author_ids = tuple(author_ids)
+        if not author_ids:
+            return self.none()
+        meta = self.model._meta
+        ranked = (
+            f'SELECT ranked.id FROM ('
+            f'SELECT {meta.pk.column} AS id, ROW_NUMBER() OVER ('
+            f'PARTITION BY author_id ORDER BY pub_date DESC, '
+            f'{meta.pk.column} DESC) AS row_number '
+            f'FROM {meta.db_table} '
+            f'WHERE author_id IN ({", ".join(["%s"] * len(author_ids))})'
+            f') ranked WHERE ranked.row_number <= %s'
+        )
+        return self.filter(
+            author_id__in=author_ids,
+            pk__in=RawSQL(ranked, (*author_ids, limit)),
+        )
+
+    def search(self, query):
+        """Полнотекстовый поиск по названию и описанию с ранжированием."""
+        if not query.split():
+            return self
+        vendor = connections[self.db].vendor
+        if vendor == 'postgresql':
+            search_query = SearchQuery(
+                query, config=settings.SEARCH_CONFIG, search_type='websearch'
+            )
+            queryset = self.filter(search_vector=search_query).annotate(
+                search_rank=SearchRank(F('search_vector'), search_query)
+            )
+        elif vendor == 'sqlite':
+            match = fts5_query(query)
+            table = self.model._meta.db_table
+            queryset = self.filter(
+                pk__in=RawSQL(
+                    f'SELECT rowid FROM {RECIPE_FTS_TABLE} '
+                    f'WHERE {RECIPE_FTS_TABLE} MATCH %s',
+                    (match,),
+                )
+            ).annotate(
+                search_rank=RawSQL(
+                    f'SELECT -bm25({RECIPE_FTS_TABLE}) '
+                    f'FROM {RECIPE_FTS_TABLE} '
+                    f'WHERE {RECIPE_FTS_TABLE} MATCH %s '
+                    f'AND rowid = {table}.id',
+                    (match,),
+                    output_field=FloatField(),
+                )
+            )
+        else:
+            queryset = self.filter(
+                Q(name__icontains=query) | Q(text__icontains=query)
+            ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+        return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+    def update_search_index(self):
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            self.update(
+                search_vector=(
+                    SearchVector(
+                        'name', weight='A', config=settings.SEARCH_CONFIG
+                    )
+                    + SearchVector(
+                        'text', weight='B', config=settings.SEARCH_CONFIG
+                    )
+                )
+            )
+        elif connection.vendor == 'sqlite':
+            rows = list(self.values_list('pk', 'name', 'text'))
+            with transaction.atomic(using=self.db):
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f'DELETE FROM {RECIPE_FTS_TABLE} WHERE rowid = %s',
+                        [(pk,) for pk, _, _ in rows],
+                    )
+                    cursor.executemany(
+                        f'INSERT INTO {RECIPE_FTS_TABLE} (rowid, name, text) '
+                        f'VALUES (%s, %s, %s)',
+                        rows,
+                    )
+
 
 class RecipeManager(models.Manager):
     def get_queryset(self):
@@ -54,3 +301,11 @@ class RecipeManager(models.Manager):
 
     def with_shopcart_and_favorite(self, user):
         return self.get_queryset().with_shopcart_and_favorite(user=user)
+
+    def search(self, query):
+        return self.get_queryset().search(query=query)
+
+    def first_per_author(self, author_ids, limit):
+        return self.get_queryset().first_per_author(
+            author_ids=author_ids, limit=limit
+        )
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:40
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX recipe_search_vector_idx '
+            'ON recipe_recipe USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE recipe_recipe SET search_vector = "
+            "setweight(to_tsvector(%s::regconfig, name), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, text), 'B')",
+            params=(settings.SEARCH_CONFIG, settings.SEARCH_CONFIG),
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE recipe_recipe_fts USING fts5(name, text)'
+        )
+        schema_editor.execute(
+            'INSERT INTO recipe_recipe_fts (rowid, name, text) '
+            'SELECT id, name, text FROM recipe_recipe'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS recipe_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, F, Sum
+
+
+def fill_shop_list_ingredients(apps, schema_editor):
+    ReciepeShopList = apps.get_model('recipe', 'ReciepeShopList')
+    ShopListIngredient = apps.get_model('recipe', 'ShopListIngredient')
+    ShopListIngredient.objects.bulk_create(
+        ShopListIngredient(**row)
+        for row in ReciepeShopList.objects.filter(
+            recipe__ingredients_with_amount__isnull=False
+        ).values(
+            'user_id',
+            ingredient_id=F('recipe__ingredients_with_amount__ingredient_id'),
+        ).annotate(
+            amount=Sum('recipe__ingredients_with_amount__amount'),
+            recipes_count=Count('recipe_id'),
+        ).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0007_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopListIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.FloatField(default=0)),
+                ('recipes_count', models.PositiveIntegerField(default=0)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shop_list_ingredients', to='recipe.ingredient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shop_list_ingredients', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='shoplistingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shop_list_ingredient'),
+        ),
+        migrations.RunPython(
+            fill_shop_list_ingredients, migrations.RunPython.noop
+        ),
+    ]
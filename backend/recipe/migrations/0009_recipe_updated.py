@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_shoplistingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0009_recipe_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Уменьшенные копии картинки'),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
-from recipe.managers import RecipeManager, RecipeShopListManager
+from recipe.managers import RecipeManager, ShopListIngredientManager
 
 
 User = get_user_model()
@@ -53,6 +54,12 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         help_text='Картинка, закодированная в Base64',
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Уменьшенные копии картинки',
+    )
     name = models.CharField(max_length=200, help_text='Название')
     text = models.TextField(help_text='Описание')
     cooking_time = models.PositiveIntegerField(
@@ -63,6 +70,8 @@ class Recipe(models.Model):
         User, on_delete=models.CASCADE, related_name='recipies'
     )
     pub_date = models.DateTimeField(auto_now=False, auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     objects = models.Manager()
     with_params = RecipeManager()
 
@@ -71,6 +80,11 @@ class Recipe(models.Model):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+        )
 
 
 class RecipeFavourite(models.Model):
@@ -105,8 +119,6 @@ class ReciepeShopList(models.Model):
         Recipe, on_delete=models.CASCADE, related_name='recipe_cart'
     )
     added = models.DateTimeField(auto_now_add=True, db_index=True)
-    objects = models.Manager()
-    ingredients = RecipeShopListManager()
 
     def __str__(self) -> str:
         return f'{self.recipe} in {self.user} cart'
@@ -144,3 +156,30 @@ class RecipeIngredient(models.Model):
                 fields=('recipe', 'ingredient'),
             ),
         )
+
+
+class ShopListIngredient(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='shop_list_ingredients'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shop_list_ingredients',
+    )
+    amount = models.FloatField(default=0)
+    recipes_count = models.PositiveIntegerField(default=0)
+    objects = ShopListIngredientManager()
+
+    def __str__(self) -> str:
+        return f'{self.ingredient} in {self.user} shopping list'
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                name='unique_shop_list_ingredient',
+                fields=('user', 'ingredient'),
+            ),
+        )
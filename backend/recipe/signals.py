@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from jobs.models import Job
+from recipe.images import delete_variants, variants_outdated
+from recipe.ingredient_index import ingredient_index
+from recipe.managers import remove_from_search_index
+from recipe.models import (
+    Ingredient,
+    ReciepeShopList,
+    Recipe,
+    ShopListIngredient,
+    Tag,
+)
+from recipe.versions import ingredients_version, tags_version
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+    transaction.on_commit(ingredients_version.bump)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    transaction.on_commit(tags_version.bump)
+
+
+@receiver(post_save, sender=ReciepeShopList)
+def add_recipe_to_shop_list(sender, instance, created, **kwargs):
+    if created:
+        ShopListIngredient.objects.add_recipe(
+            user_ids=(instance.user_id,), recipe=instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ReciepeShopList)
+def remove_recipe_from_shop_list(sender, instance, **kwargs):
+    ShopListIngredient.objects.remove_recipe(
+        user_ids=(instance.user_id,), recipe=instance.recipe_id
+    )
+
+
+def drop_image_variants(recipe, variants):
+    """Удаляет файлы вариантов после коммита."""
+    if not variants:
+        return
+    storage = recipe.image.storage
+    transaction.on_commit(lambda: delete_variants(storage, variants))
+
+
+def queue_image_variants_job(recipe_id):
+    """Ставит задачу на варианты, если такая ещё не ждёт в очереди."""
+    if not Job.objects.filter(
+        kind='recipe_image_variants',
+        status=Job.Status.PENDING,
+        params__recipe_id=recipe_id,
+    ).exists():
+        Job.objects.create(
+            kind='recipe_image_variants', params={'recipe_id': recipe_id}
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def queue_image_variants(sender, instance, raw, **kwargs):
+    if raw or not variants_outdated(instance):
+        return
+    stale = instance.image_variants
+    if stale and stale.get('source') != instance.image.name:
+        drop_image_variants(instance, stale)
+        instance.image_variants = {}
+        Recipe.objects.filter(pk=instance.pk).update(image_variants={})
+    transaction.on_commit(lambda: queue_image_variants_job(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_variants(sender, instance, **kwargs):
+    drop_image_variants(instance, instance.image_variants)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_search_index_row(sender, instance, using, **kwargs):
+    remove_from_search_index((instance.pk,), using=using)
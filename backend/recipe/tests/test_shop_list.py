@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from recipe.models import (
+    Ingredient,
+    ReciepeShopList,
+    Recipe,
+    RecipeIngredient,
+    ShopListIngredient,
+    Tag,
+)
+
+
+User = get_user_model()
+
+
+class ShopListIngredientTest(TestCase):
+    """Суммы в списках покупок совпадают с пересчётом через rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader{number}',
+                email=f'reader{number}@example.com',
+                password='pass',
+            )
+            for number in range(2)
+        ]
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(3)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.admin,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/test.png',
+            )
+            for number in range(2)
+        ]
+        for number, recipe in enumerate(cls.recipes, start=1):
+            recipe.tags.set((cls.tag,))
+            for ingredient in cls.ingredients[:2]:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=0.1 * number
+                )
+        for reader in cls.readers:
+            for recipe in cls.recipes:
+                ReciepeShopList.objects.create(user=reader, recipe=recipe)
+
+    def shop_lists(self):
+        return {
+            (row.user_id, row.ingredient_id): (
+                round(row.amount, 6), row.recipes_count
+            )
+            for row in ShopListIngredient.objects.filter(recipes_count__gt=0)
+        }
+
+    def assert_matches_rebuild(self):
+        shop_lists = self.shop_lists()
+        ShopListIngredient.objects.rebuild(
+            user_ids=[reader.pk for reader in self.readers]
+        )
+        self.assertEqual(shop_lists, self.shop_lists())
+
+    def test_admin_ingredient_changes_update_shop_lists(self):
+        recipe = self.recipes[0]
+        rows = list(recipe.ingredients_with_amount.order_by('id'))
+        carts = list(recipe.recipe_cart.order_by('id'))
+        data = {
+            'name': recipe.name,
+            'cooking_time': recipe.cooking_time,
+            'author': recipe.author_id,
+            'text': recipe.text,
+            'tags': [self.tag.pk],
+            'ingredients_with_amount-TOTAL_FORMS': 3,
+            'ingredients_with_amount-INITIAL_FORMS': 2,
+            'ingredients_with_amount-0-id': rows[0].pk,
+            'ingredients_with_amount-0-recipe': recipe.pk,
+            'ingredients_with_amount-0-ingredient': rows[0].ingredient_id,
+            'ingredients_with_amount-0-amount': 5,
+            'ingredients_with_amount-1-id': rows[1].pk,
+            'ingredients_with_amount-1-recipe': recipe.pk,
+            'ingredients_with_amount-1-ingredient': rows[1].ingredient_id,
+            'ingredients_with_amount-1-amount': rows[1].amount,
+            'ingredients_with_amount-1-DELETE': 'on',
+            'ingredients_with_amount-2-recipe': recipe.pk,
+            'ingredients_with_amount-2-ingredient': self.ingredients[2].pk,
+            'ingredients_with_amount-2-amount': 3,
+            'recipe_favourite-TOTAL_FORMS': 0,
+            'recipe_favourite-INITIAL_FORMS': 0,
+            'recipe_cart-TOTAL_FORMS': 2,
+            'recipe_cart-INITIAL_FORMS': 2,
+            'recipe_cart-0-id': carts[0].pk,
+            'recipe_cart-0-recipe': recipe.pk,
+            'recipe_cart-0-user': carts[0].user_id,
+            'recipe_cart-1-id': carts[1].pk,
+            'recipe_cart-1-recipe': recipe.pk,
+            'recipe_cart-1-user': carts[1].user_id,
+            'recipe_cart-1-DELETE': 'on',
+        }
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse('admin:recipe_recipe_change', args=(recipe.pk,)), data
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(recipe.ingredients_with_amount.count(), 2)
+        self.assert_matches_rebuild()
+
+    def test_emptied_rows_reset_amount(self):
+        for _ in range(3):
+            ReciepeShopList.objects.filter(user=self.readers[0]).delete()
+            for recipe in self.recipes:
+                ReciepeShopList.objects.create(
+                    user=self.readers[0], recipe=recipe
+                )
+        ReciepeShopList.objects.filter(user=self.readers[0]).delete()
+        self.assertEqual(
+            set(
+                ShopListIngredient.objects.filter(
+                    user=self.readers[0]
+                ).values_list('amount', 'recipes_count')
+            ),
+            {(0, 0)},
+        )
+        self.assert_matches_rebuild()
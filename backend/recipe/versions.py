@@ -0,0 +1,40 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+class Version:
+    """Версия ресурса, общая для всех воркеров.
+
+    Хранится в маленьком файле в CACHE_DIR. Новая версия — текущее
+    время в наносекундах, поэтому увеличение не требует чтения.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def path(self):
+        return Path(settings.CACHE_DIR) / 'versions' / self.name
+
+    def get(self):
+        try:
+            return self.path.read_text()
+        except FileNotFoundError:
+            return '0'
+
+    def bump(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=self.path.parent, prefix='.'
+        )
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(str(time.time_ns()))
+        os.replace(temp_path, self.path)
+
+
+tags_version = Version('tags')
+ingredients_version = Version('ingredients')
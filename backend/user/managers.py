@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.contrib.auth.models import UserManager as DjangoUserManager
+from django.db import models
+from django.db.models import Count, Exists, OuterRef, Value
+
+
+class UserQuerySet(models.QuerySet):
+    def with_is_subscribed(self, user):
+        if user is not None and user.is_authenticated:
+            user_following = apps.get_model(
+                app_label='user', model_name='UserFollowing'
+            ).objects.filter(user=OuterRef('pk'), following_user=user)
+            return self.annotate(is_subscribed=Exists(user_following))
+        return self.annotate(is_subscribed=Value(False))
+
+    def with_recipes_count(self):
+        # Meta.ordering не действует на запросы с GROUP BY, без явного
+        # порядка страницы пагинации были бы нестабильны.
+        queryset = self.annotate(recipes_count=Count('recipies'))
+        if not queryset.ordered:
+            queryset = queryset.order_by(*self.model._meta.ordering)
+        return queryset
+
+
+class UserManager(DjangoUserManager):
+    def get_queryset(self):
+        return UserQuerySet(self.model, using=self._db)
+
+    def with_is_subscribed(self, user):
+        return self.get_queryset().with_is_subscribed(user=user)
+
+    def with_recipes_count(self):
+        return self.get_queryset().with_recipes_count()
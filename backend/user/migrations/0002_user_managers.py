@@ -0,0 +1,20 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:05
+
+from django.db import migrations
+import user.managers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', user.managers.UserManager()),
+            ],
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 
+from user.managers import UserManager
+
 
 class User(AbstractUser):
     """Кастомная модель юзера."""
@@ -34,6 +36,7 @@ class User(AbstractUser):
         blank=True,
         related_name='shop_list',
     )
+    objects = UserManager()
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 